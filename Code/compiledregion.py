@@ -0,0 +1,181 @@
+'''
+About  : Implements the CompiledRegion class which holds a precomputed
+         classification of British National Grid squares against the target
+         geographic region, so that region tests need no GIS libraries at
+         runtime.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+import os
+from typing import Final
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+# Square classes
+OUTSIDE: Final[int] = 0     # square does not touch the region
+INSIDE: Final[int] = 1      # square lies wholly within the region
+STRADDLE: Final[int] = 2    # square crosses the region boundary
+
+# Resolutions (metres) at which squares are classified, coarsest first
+LEVELS: Final[tuple[int, ...]] = (10000, 1000, 100)
+
+# Filename suffix of the compiled region file (stored next to the shapefile)
+SUFFIX: Final[str] = '.region.npz'
+
+# ------------------------------------------------------------------------------
+
+def get_filename(fn_gis: str) -> str:
+    '''Return the compiled region filename associated with a GIS shapefile.
+    Args:
+        fn_gis (string) - path to GIS shapefile
+    Returns:
+        (string) - path to compiled region file
+    '''
+    return os.path.splitext(fn_gis)[0] + SUFFIX
+
+# ------------------------------------------------------------------------------
+
+class CompiledRegion:
+    '''Class which answers region tests for grid squares using precomputed
+       square classifications at 10km, 1km and 100m resolution.'''
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, fn: str) -> None:
+        '''Constructor. Load a compiled region file.
+        Args:
+            fn (string) - path to compiled region file
+        Returns:
+            N/A
+        '''
+        self.fn: str = fn
+        with np.load(fn) as data:
+            self.x0, self.y0 = (int(v) for v in data['origin'])
+            self.grids: dict[int, np.ndarray] = {
+                lvl: data[f'level_{lvl}'] for lvl in LEVELS}
+            self.crs: str = str(data['crs'])
+            self.wkb: bytes = data['wkb'].tobytes()
+            # Fingerprint of the shapefile from which the file was compiled
+            self.fingerprint: str = (str(data['fingerprint'])
+                                     if 'fingerprint' in data else '')
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def compile(region: BaseGeometry, crs: str, fn: str, key: str) -> None:
+        '''Classify the grid squares covering a region and save the results.
+           Squares at each level are only tested if their parent straddles the
+           region boundary.
+        Args:
+            region (BaseGeometry) - region geometry (British National Grid)
+            crs (string) - WKT representation of region CRS
+            fn (string) - path to compiled region file
+            key (string) - fingerprint of the source shapefile
+        Returns:
+            N/A
+        '''
+        # ----------------------------------------------------------------------
+        def classify(x: np.ndarray, y: np.ndarray, size: int) -> np.ndarray:
+            boxes = shapely.box(x, y, x + size, y + size)
+            rv = np.full(len(boxes), OUTSIDE, dtype=np.uint8)
+            rv[shapely.intersects(region, boxes)] = STRADDLE
+            rv[shapely.covers(region, boxes)] = INSIDE
+            return rv
+        # ----------------------------------------------------------------------
+
+        log.info('Compiling region file: %s', fn)
+        shapely.prepare(region)
+        # Grid origin/extent, padded by one coarse square on each side
+        top = LEVELS[0]
+        xmin, ymin, xmax, ymax = region.bounds
+        x0 = int(xmin // top) * top - top
+        y0 = int(ymin // top) * top - top
+        nx = int((xmax - x0) // top) + 2
+        ny = int((ymax - y0) // top) + 2
+        grids: dict[str, np.ndarray] = {}
+        parent: np.ndarray|None = None
+        prev = top
+        for lvl in LEVELS:
+            if parent is None:
+                grid = np.full((ny, nx), STRADDLE, dtype=np.uint8)
+            else:
+                # Children inherit parent class unless parent straddles boundary
+                f = prev // lvl
+                grid = np.repeat(np.repeat(parent, f, axis=0), f, axis=1)
+            iy, ix = np.nonzero(grid == STRADDLE)
+            grid[iy, ix] = classify(x0 + ix * lvl, y0 + iy * lvl, lvl)
+            log.debug('Level %im: %i squares tested', lvl, len(ix))
+            grids[f'level_{lvl}'] = grid
+            parent, prev = grid, lvl
+
+        np.savez_compressed(fn, origin=np.array([x0, y0]), crs=np.array(crs),
+                            fingerprint=np.array(key),
+                            wkb=np.frombuffer(shapely.to_wkb(region), dtype=np.uint8),
+                            **grids)
+
+    # --------------------------------------------------------------------------
+
+    def square_in_region(self, e: int, n: int, size: int) -> bool|None:
+        '''Determine whether a grid square intersects the region.
+        Args:
+            e (int) - easting of south-west corner
+            n (int) - northing of south-west corner
+            size (int) - length of side of square (metres)
+        Returns:
+            (bool|None) - True if square intersects region, None if the square
+                          is finer than 100m and its parent straddles the region
+                          boundary (geometric test required)
+        '''
+        fine = LEVELS[-1]
+        if size < fine:
+            # Classification of parent square decides unless it straddles
+            c = self.square_class(fine, e // fine * fine, n // fine * fine)
+            return None if c == STRADDLE else c == INSIDE
+        for lvl in LEVELS:
+            if size % lvl == 0 and e % lvl == 0 and n % lvl == 0:
+                grid = self.grids[lvl]
+                ny, nx = grid.shape
+                ix0 = max((e - self.x0) // lvl, 0)
+                iy0 = max((n - self.y0) // lvl, 0)
+                ix1 = min((e + size - self.x0) // lvl, nx)
+                iy1 = min((n + size - self.y0) // lvl, ny)
+                if ix0 >= ix1 or iy0 >= iy1:
+                    return False
+                return bool((grid[iy0:iy1, ix0:ix1] != OUTSIDE).any())
+
+        return None
+
+    # --------------------------------------------------------------------------
+
+    def square_class(self, lvl: int, e: int, n: int) -> int:
+        '''Return the class of the square at a given level containing a point.
+        Args:
+            lvl (int) - level (square size, metres)
+            e (int) - easting
+            n (int) - northing
+        Returns:
+            (int) - OUTSIDE, INSIDE or STRADDLE
+        '''
+        grid = self.grids[lvl]
+        ix = (e - self.x0) // lvl
+        iy = (n - self.y0) // lvl
+        if 0 <= ix < grid.shape[1] and 0 <= iy < grid.shape[0]:
+            return int(grid[iy, ix])
+
+        return OUTSIDE
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
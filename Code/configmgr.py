@@ -26,9 +26,15 @@ DEFAULT_FN_CONFIG: Final[str] = '../Config/config.ini'  # default config filenam
 class ConfigMgr:
     '''Class which loads runtime configuration from file.'''
 
+    columnar_skip: bool = False   # apply skip tests to whole file at once
+    columnar_swift: bool = False  # create Swift records of whole file at once
+    csv_engine: str = const.CSV_ENGINE_PYTHON  # parser of input CSV files
     dir_data_in: str = ''         # folder in which to find iRecords to be processed
     dir_data_out: str = ''        # folder in which to find iRecords to be processed
+    dupe_hash: bool = False       # de-dupe using digests of record values
+    dupe_store: str = ''          # path to store of earlier files' records (de-dupe)
     excel: bool = True            # produce Excel workbook results file
+    fast_reject: str = const.FAST_REJECT_OFF  # skip region test of rejected records
     file_abundance: str = ''      # path to abundance mapping file
     file_duplicates: str = ''     # path to duplicate records file
     file_exc_taxons: str = ''     # path to family-exluded insect taxons
@@ -37,7 +43,23 @@ class ConfigMgr:
     file_processed: str = ''      # path to processed records file
     file_rec_type: str = ''       # path to sample method / record type map file
     file_users: str = ''          # path to user identities & permissions file
+    intern_values: bool = False   # share one instance of each repeated value
     plot: bool = True             # plot region chart
+    plot_headless: bool = False   # save region chart to file, not display
+    region_batch: bool = True     # classify each file's gridrefs in bulk
+    region_cache_size: int = 100000  # max. gridref verdicts cached (0 = off)
+    region_compiled: bool = False  # use compiled region file if available
+    region_core_buffer: int = 1000   # inset (metres) of prepared region core
+    region_field: str = ''         # shapefile field naming regions (routing)
+    region_geometry_cache: bool = False  # cache parsed region next to shapefile
+    region_points: bool = False    # resolve records from lat/lon if possible
+    region_prepared: bool = False  # use unioned, prepared region geometry
+    region_tile_vertices: int = 256  # max. vertices per region tile
+    region_tiled: bool = False     # split region into quadtree tiles
+    region_vcs: tuple[str, ...] = ()  # VC numbers of region (trust VC column)
+    region_verdict_store: bool = False  # keep gridref verdicts between runs
+    rule_cache_size: int = 10000  # max. results cached per rule (0 = off)
+    stream_chunk: int = 0         # records per chunk when streaming (0 = off)
     log_level: int = logging.INFO
 
     # --------------------------------------------------------------------------
@@ -125,8 +147,53 @@ class ConfigMgr:
         # [Options]
         if const.C_OPTIONS in self.config:
             s_options = self.config[const.C_OPTIONS]
+            self.columnar_skip = s_options.get(const.C_COLUMNAR_SKIP,
+                                               'False').lower() == 'true'
+            self.columnar_swift = s_options.get(const.C_COLUMNAR_SWIFT,
+                                                'False').lower() == 'true'
             self.plot = s_options.get(const.C_PLOT, 'True').lower() == 'true'
+            ce = s_options.get(const.C_CSV_ENGINE, const.CSV_ENGINE_PYTHON).lower()
+            if ce in const.CSV_ENGINES:
+                self.csv_engine = ce
+            else:
+                log.error('Unknown CSV engine: %s', ce)
+            self.plot_headless = s_options.get(const.C_PLOT_HEADLESS,
+                                               'False').lower() == 'true'
+            self.dupe_hash = s_options.get(const.C_DUPE_HASH, 'False').lower() == 'true'
+            self.dupe_store = s_options.get(const.C_DUPE_STORE, '').strip()
             self.excel = s_options.get(const.C_EXCEL, 'True').lower() == 'true'
+            fr = s_options.get(const.C_FAST_REJECT, const.FAST_REJECT_OFF).lower()
+            if fr in const.FAST_REJECT_MODES:
+                self.fast_reject = fr
+            else:
+                log.error('Unknown fast reject mode: %s', fr)
+            self.intern_values = s_options.get(const.C_INTERN_VALUES,
+                                               'False').lower() == 'true'
+            self.region_batch = s_options.get(const.C_REGION_BATCH,
+                                              'True').lower() == 'true'
+            self.region_cache_size = s_options.getint(const.C_REGION_CACHE_SIZE,
+                                                      100000)
+            self.region_compiled = s_options.get(const.C_REGION_COMPILED,
+                                                 'False').lower() == 'true'
+            self.region_core_buffer = s_options.getint(const.C_REGION_CORE_BUFFER,
+                                                       1000)
+            self.region_field = s_options.get(const.C_REGION_FIELD, '').strip()
+            self.region_geometry_cache = s_options.get(
+                const.C_REGION_GEOMETRY_CACHE, 'False').lower() == 'true'
+            self.region_points = s_options.get(const.C_REGION_POINTS,
+                                               'False').lower() == 'true'
+            self.region_prepared = s_options.get(const.C_REGION_PREPARED,
+                                                 'False').lower() == 'true'
+            self.region_tile_vertices = s_options.getint(
+                const.C_REGION_TILE_VERTICES, 256)
+            self.region_tiled = s_options.get(const.C_REGION_TILED,
+                                              'False').lower() == 'true'
+            self.region_vcs = tuple(vc.strip() for vc in s_options.get(
+                const.C_REGION_VC, '').split(',') if len(vc.strip()) > 0)
+            self.region_verdict_store = s_options.get(
+                const.C_REGION_VERDICT_STORE, 'False').lower() == 'true'
+            self.rule_cache_size = s_options.getint(const.C_RULE_CACHE_SIZE, 10000)
+            self.stream_chunk = s_options.getint(const.C_STREAM_CHUNK, 0)
         else:
             log.error(errmsg, self.fn_config, const.C_OPTIONS)
         # [Logging]
@@ -6,7 +6,12 @@ from typing import Final
 
 # ------------------------------------------------------------------------------
 # Config file section headings and field names
+C_COLUMNAR_SKIP: Final[str] = 'ColumnarSkip'
+C_COLUMNAR_SWIFT: Final[str] = 'ColumnarSwift'
+C_CSV_ENGINE: Final[str] = 'CsvEngine'
 C_DATA: Final[str] = 'Data'
+C_DUPE_HASH: Final[str] = 'DupeHash'
+C_DUPE_STORE: Final[str] = 'DupeStore'
 C_FOLDER_IN: Final[str] = 'Folder_Input'
 C_FOLDER_OUT: Final[str] = 'Folder_Output'
 C_FILES: Final[str] = 'Files'
@@ -22,7 +27,36 @@ C_LOGGING: Final[str] = 'Logging'
 C_LOGLEVEL: Final[str] = 'LogLevel'
 C_OPTIONS: Final[str] = 'Options'
 C_PLOT: Final[str] = 'Plot'
+C_PLOT_HEADLESS: Final[str] = 'PlotHeadless'
 C_EXCEL: Final[str] = 'Excel'
+C_FAST_REJECT: Final[str] = 'FastReject'
+C_INTERN_VALUES: Final[str] = 'InternValues'
+C_REGION_BATCH: Final[str] = 'RegionBatch'
+C_REGION_CACHE_SIZE: Final[str] = 'RegionCacheSize'
+C_REGION_COMPILED: Final[str] = 'RegionCompiled'
+C_REGION_CORE_BUFFER: Final[str] = 'RegionCoreBuffer'
+C_REGION_FIELD: Final[str] = 'RegionField'
+C_REGION_GEOMETRY_CACHE: Final[str] = 'RegionGeometryCache'
+C_REGION_POINTS: Final[str] = 'RegionPoints'
+C_REGION_PREPARED: Final[str] = 'RegionPrepared'
+C_REGION_TILE_VERTICES: Final[str] = 'RegionTileVertices'
+C_REGION_TILED: Final[str] = 'RegionTiled'
+C_REGION_VC: Final[str] = 'RegionVC'
+C_REGION_VERDICT_STORE: Final[str] = 'RegionVerdictStore'
+C_RULE_CACHE_SIZE: Final[str] = 'RuleCacheSize'
+C_STREAM_CHUNK: Final[str] = 'StreamChunk'
+
+# Fast reject modes (see Rules.is_skip)
+FAST_REJECT_OFF: Final[str] = 'off'         # run all tests, report all reasons
+FAST_REJECT_FIRST: Final[str] = 'first'     # report first failed test only
+FAST_REJECT_CHEAP: Final[str] = 'cheap'     # report all failed cheap tests
+FAST_REJECT_MODES: Final[set[str]] = {FAST_REJECT_OFF, FAST_REJECT_FIRST,
+                                      FAST_REJECT_CHEAP}
+
+# CSV engines used to read input files (see RecordParser.read_records)
+CSV_ENGINE_PYTHON: Final[str] = 'python'    # csv.DictReader
+CSV_ENGINE_C: Final[str] = 'c'              # pandas C parser
+CSV_ENGINES: Final[set[str]] = {CSV_ENGINE_PYTHON, CSV_ENGINE_C}
 
 # ------------------------------------------------------------------------------
 # Swift species import file column headers.
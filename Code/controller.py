@@ -8,6 +8,7 @@ About  : Implements the RecordController class which orchestrates the data
 import logging
 import os
 
+import utils
 from configmgr import ConfigMgr
 from recordparser import RecordParser
 from utils import ElapsedTime
@@ -35,19 +36,34 @@ class RecordController:
 
     # --------------------------------------------------------------------------
 
+    def compile_region(self) -> None:
+        '''Compile the GIS region into a file of classified grid squares.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        et = ElapsedTime()
+        fn = self.parser.crosscheck.georegion.compile()
+        log.info('Compiled region file written: %s', fn)
+        et.log_elapsed_time()
+
+    # --------------------------------------------------------------------------
+
     def get_files(self, folder: str) -> list[str]:
         '''Get list of filenames in a target folder.
         Args: 
             folder (string) - path to folder containing files to parse
         Returns: 
-            (list of strings) - filenames to be parsed
+            (list of strings) - filenames to be parsed (each CSV file within
+                                a zip archive is a separate file)
         '''
         log.info('Reading filenames in folder: %s', folder)
         files: list[str] = []
         for filename in os.listdir(folder):
             f = os.path.join(folder, filename)
             if os.path.isfile(f):
-                files.append(f)
+                files += utils.list_inputs(f)
 
         return files
 
@@ -62,16 +78,19 @@ class RecordController:
         '''
         et = ElapsedTime()
         files = self.get_files(self.config.dir_data_in)
-        for ix, f in enumerate(files):
-            log.info('-'*50)
-            log.info('Processing file %i of %i', ix+1, len(files))
-            self.parser.read_file(f)
+        try:
+            for ix, f in enumerate(files):
+                log.info('-'*50)
+                log.info('Processing file %i of %i', ix+1, len(files))
+                self.parser.read_file(f)
+        finally:
+            self.parser.close()
 
         log.info('-'*50)
         log.info('Finished')
         et.log_elapsed_time()
         # Avoid any plots being automatically closed at end of script
-        if self.config.plot is True:
+        if self.config.plot is True and self.config.plot_headless is False:
             input('Press Enter key to continue...')
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,147 @@
+'''
+About  : Implements the CountParser class which parses the iRecord "Count of
+         sex or stage" field into abundance and sex/stage terms. The results
+         for recently seen values are remembered.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+import re
+from typing import Final, TypeAlias
+
+import const
+import utils
+from memocache import MemoCache
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+# Abundance, stage ('' if none named) and sex of one term of a count
+CountTerm: TypeAlias = tuple[str, str, str]
+# Parsed count: (count text, terms, parse error). Terms are None if the count
+# names no sex/stage (e.g. a number or number range).
+CountParse: TypeAlias = tuple[str, tuple[CountTerm, ...]|None, bool]
+
+# ------------------------------------------------------------------------------
+
+class CountParser:
+    '''Class which parses and remembers "Count of sex or stage" values.'''
+
+    NUMBER: Final[re.Pattern] = re.compile(r">?c?\d[0-9\-+/,'s ]*")
+    PUNCTUATION: Final[re.Pattern] = re.compile(r'[(),]')
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, size: int) -> None:
+        '''Constructor.
+        Args:
+            size (int) - max. number of results remembered (0 = none)
+        Returns:
+            N/A
+        '''
+        # Initial abundance and parse result of recently seen counts
+        self.abundances: MemoCache = MemoCache('Count abundance',
+                                               self.format_abundance, size)
+        self.parsed: MemoCache = MemoCache('Count parse', self.parse_count, size)
+
+    # --------------------------------------------------------------------------
+
+    def format_abundance(self, count: str) -> str:
+        '''Return the initial abundance of a count (see get_abundance) without
+           reference to earlier results.
+        Args:
+            count (string) - iRecord count
+        Returns:
+            (string) - abundance (lower case, number words as digits)
+        '''
+        c = count.lower()
+        n = utils.word_to_num(c)
+
+        return c if n is None else str(n)
+
+    # --------------------------------------------------------------------------
+
+    def get_abundance(self, count: str) -> str:
+        '''Return the initial Swift abundance of a count, before any sex/stage
+           terms are considered.
+        Args:
+            count (string) - iRecord count
+        Returns:
+            (string) - abundance (lower case, number words as digits)
+        '''
+        return self.abundances(count)
+
+    # --------------------------------------------------------------------------
+
+    def log_stats(self) -> None:
+        '''Write cache statistics to log.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.abundances.log_stats()
+        self.parsed.log_stats()
+
+    # --------------------------------------------------------------------------
+
+    def parse(self, count: str) -> CountParse:
+        '''Parse a count into pairs of number and sex/stage terms.
+        Args:
+            count (string) - iRecord count
+        Returns:
+            (CountParse) - parse result
+        '''
+        return self.parsed(count)
+
+    # --------------------------------------------------------------------------
+
+    def parse_count(self, count: str) -> CountParse:
+        '''Parse a count (see parse) without reference to earlier results.
+        Args:
+            count (string) - iRecord count
+        Returns:
+            (CountParse) - parse result
+        '''
+        c = count.strip()
+        n = utils.word_to_num(c)
+        if n is not None:
+            c = str(n)
+        # If count is a number or number range, then there are no terms
+        if len(c) == 0 or c.replace('-', '').isdigit():
+            return c, None, False
+
+        # Extract abundance
+        num = self.NUMBER.findall(c)
+        # Extract sex/stage terms
+        trm = self.NUMBER.split(c)
+        if all(len(t) == 0 for t in trm):
+            return c, None, False
+        if len(num) != len(trm)-1:
+            return c, None, True
+
+        terms: list[CountTerm] = []
+        for i, term in enumerate(num):
+            sex = ''
+            stage = ''
+            spec = self.PUNCTUATION.sub('', trm[i+1].lower().strip())
+            # Parse spec into separate words and check against sex/stage terms
+            for word in spec.split():
+                # Is this a sex/stage term?
+                if word in const.STAGE_TERMS:
+                    stage = const.STAGE_TERMS[word].capitalize()
+                elif word in const.SEX_TERMS:
+                    sex = const.SEX_TERMS[word].lower()
+            terms.append((term.strip(), stage, sex))
+
+        return c, tuple(terms), False
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -12,6 +12,7 @@ import pandas as pd
 import const
 from georegion import GeoRegion
 from configmgr import ConfigMgr
+from memocache import MemoCache
 from utils import make_file_backup, read_csv_robust
 
 # ------------------------------------------------------------------------------
@@ -46,12 +47,16 @@ class Crosschecker:
         self.processed: Set[str] = set()
         self.sample_methods: dict[str, str] = {}
         self.user_identities: dict[str, UserIdentity] = {}
+        # Results of lookups for recently seen inputs
+        size = config.rule_cache_size
+        self.memo_abundance = MemoCache('Abundance', self.find_abundance, size)
+        self.memo_record_type = MemoCache('Record type', self.find_record_type, size)
         self.load_files()
 
     # --------------------------------------------------------------------------
 
-    def get_abundance(self, taxon_group: str, count: str) -> tuple[bool, str]:
-        '''Map iRecord count to Swift abundance.
+    def find_abundance(self, taxon_group: str, count: str) -> tuple[bool, str]:
+        '''Map iRecord count to Swift abundance (see get_abundance).
         Args:
             taxon_group (string) - iRecord taxon group
             count (string) - iRecord count
@@ -71,17 +76,16 @@ class Crosschecker:
 
     # --------------------------------------------------------------------------
 
-    def get_record_type(self, sample_method: str, images: str) -> str|None:
-        '''Map iRecord sample method to Swift record type.
+    def find_record_type(self, sample_method: str, has_images: bool) -> str|None:
+        '''Map iRecord sample method to Swift record type (see get_record_type).
         Args: 
             sample_method (string) - iRecord sample method
-            images (string) - iRecord images
+            has_images (bool) - True if the record has images
         Returns: 
             (string/None) - mapped record type, else None if no match
         '''
         # If there are images, assume it's a photograph or video
-        images = images.strip()
-        if len(images) > 0:
+        if has_images:
             return 'Photographed (or videoed)'
 
         sm = sample_method.strip().lower()
@@ -99,6 +103,30 @@ class Crosschecker:
 
     # --------------------------------------------------------------------------
 
+    def get_abundance(self, taxon_group: str, count: str) -> tuple[bool, str]:
+        '''Map iRecord count to Swift abundance.
+        Args:
+            taxon_group (string) - iRecord taxon group
+            count (string) - iRecord count
+        Returns: 
+            (tuple[bool,str]) - (True,mapped abundance type), else (False,'') if no match
+        '''
+        return self.memo_abundance(taxon_group, count)
+
+    # --------------------------------------------------------------------------
+
+    def get_record_type(self, sample_method: str, images: str) -> str|None:
+        '''Map iRecord sample method to Swift record type.
+        Args: 
+            sample_method (string) - iRecord sample method
+            images (string) - iRecord images
+        Returns: 
+            (string/None) - mapped record type, else None if no match
+        '''
+        return self.memo_record_type(sample_method, len(images.strip()) > 0)
+
+    # --------------------------------------------------------------------------
+
     def get_user_identity(self, username: str) -> str:
         '''Check whether a user has provided permission to use their real name.
         Args: 
@@ -248,6 +276,18 @@ class Crosschecker:
                                         True if p.lower() == 'yes' else False})
                 for u, n, p in zip(df[i_username], df[i_name], df[i_permission]))
 
+    # --------------------------------------------------------------------------
+
+    def log_cache_stats(self) -> None:
+        '''Write lookup cache statistics to log.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        self.memo_abundance.log_stats()
+        self.memo_record_type.log_stats()
+
 # ------------------------------------------------------------------------------
 
 '''
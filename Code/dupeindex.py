@@ -0,0 +1,221 @@
+'''
+About  : Implements the DupeIndex class which records the key of the first
+         record having each combination of duplicate-check values. Only a
+         128-bit digest of the values is kept, in open-addressed arrays,
+         so memory use is fixed per record whatever the length of the values.
+'''
+
+# ------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import sys
+from array import array
+from typing import Final
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+class DupeIndex:
+    '''Class which maps digests of duplicate-check tuples to record keys. Offers
+       the subset of the dict interface used for de-duping (get, setdefault and
+       item assignment).'''
+
+    SEPARATOR: Final[str] = '\x1f'     # joins tuple values before hashing
+    MIN_CAPACITY: Final[int] = 1024    # initial number of slots (power of 2)
+    MAX_LOAD: Final[float] = 2 / 3     # grow table when fuller than this
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, capacity: int=MIN_CAPACITY) -> None:
+        '''Constructor.
+        Args:
+            capacity (int) - initial number of slots (rounded up to power of 2)
+        Returns:
+            N/A
+        '''
+        self.count: int = 0
+        self.tuple_bytes: int = 0    # size of the tuples a dict would hold
+        # Slot and digest found by the last unsuccessful get
+        self.last: tuple[tuple, int, int, int]|None = None
+        self.allocate(1 << max(capacity - 1, 1).bit_length())
+
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        '''Return the number of tuples held.'''
+        return self.count
+
+    # --------------------------------------------------------------------------
+
+    def __setitem__(self, values: tuple, key: int) -> None:
+        '''Record the key of the first record having the given values. The
+           values must not already be held.'''
+        if self.last is not None and self.last[0] is values:
+            _, slot, lo, hi = self.last
+        else:
+            lo, hi = self.digest(values)
+            slot = self.find(lo, hi)
+        self.last = None
+        self.lo[slot] = lo
+        self.hi[slot] = hi
+        self.keys[slot] = key
+        self.count += 1
+        self.tuple_bytes += sys.getsizeof(values)
+        if self.count > self.MAX_LOAD * len(self.keys):
+            self.grow()
+
+    # --------------------------------------------------------------------------
+
+    def allocate(self, capacity: int) -> None:
+        '''Allocate empty arrays.
+        Args:
+            capacity (int) - number of slots (power of 2)
+        Returns:
+            N/A
+        '''
+        # Array elements are read as Python ints, faster than numpy scalars
+        self.lo: array = array('Q', bytes(8 * capacity))
+        self.hi: array = array('Q', bytes(8 * capacity))
+        self.keys: array = array('q', bytes(8 * capacity))   # 0 = empty
+        self.mask: int = capacity - 1
+
+    # --------------------------------------------------------------------------
+
+    def collision_risk(self) -> float:
+        '''Return the probability that any two of the tuples held share a digest
+           (birthday bound), i.e. that a record was wrongly treated as a
+           duplicate.
+        Args:
+            N/A
+        Returns:
+            (float) - probability
+        '''
+        return self.count * (self.count - 1) / 2 ** 129
+
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def digest(cls, values: tuple) -> tuple[int, int]:
+        '''Return the 128-bit digest of a tuple of strings, as two 64-bit halves.
+        Args:
+            values (tuple of strings) - duplicate-check values
+        Returns:
+            (int, int) - low and high halves of digest
+        '''
+        d = cls.fingerprint(values)
+        return int.from_bytes(d[:8], 'little'), int.from_bytes(d[8:], 'little')
+
+    # --------------------------------------------------------------------------
+
+    def find(self, lo: int, hi: int) -> int:
+        '''Return the slot holding a digest, else the empty slot where it would
+           be stored (linear probing).
+        Args:
+            lo (int) - low half of digest
+            hi (int) - high half of digest
+        Returns:
+            (int) - slot
+        '''
+        slot = lo & self.mask
+        while self.keys[slot] != 0:
+            if self.lo[slot] == lo and self.hi[slot] == hi:
+                break
+            slot = (slot + 1) & self.mask
+
+        return slot
+
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def fingerprint(cls, values: tuple) -> bytes:
+        '''Return the 128-bit digest of a tuple of strings.
+        Args:
+            values (tuple of strings) - duplicate-check values
+        Returns:
+            (bytes) - digest
+        '''
+        return hashlib.blake2b(cls.SEPARATOR.join(values).encode(),
+                               digest_size=16).digest()
+
+    # --------------------------------------------------------------------------
+
+    def get(self, values: tuple, default: int|None=None) -> int|None:
+        '''Return the key of the first record having the given values.
+        Args:
+            values (tuple of strings) - duplicate-check values
+            default (int) - value returned if values not held
+        Returns:
+            (int) - record key, else default
+        '''
+        lo, hi = self.digest(values)
+        slot = self.find(lo, hi)
+        key = self.keys[slot]
+        if key == 0:
+            # Remember where to store the values if they are added next
+            self.last = (values, slot, lo, hi)
+            return default
+
+        return key
+
+    # --------------------------------------------------------------------------
+
+    def grow(self) -> None:
+        '''Double the number of slots, re-inserting the digests held.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        lo, hi, keys = self.lo, self.hi, self.keys
+        self.allocate(2 * len(keys))
+        for l, h, k in zip(lo, hi, keys):
+            if k == 0:
+                continue
+            slot = self.find(l, h)
+            self.lo[slot] = l
+            self.hi[slot] = h
+            self.keys[slot] = k
+
+    # --------------------------------------------------------------------------
+
+    def log_stats(self) -> None:
+        '''Write the memory used and the risk of a digest collision to log.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        used = sum(len(a) * a.itemsize for a in (self.lo, self.hi, self.keys))
+        # Memory of an equivalent dict: its table plus the tuples it would hold
+        dict_bytes = sys.getsizeof(dict.fromkeys(range(self.count))) + self.tuple_bytes
+        log.info('Duplicate index: %s records in %s KB (a dict would need %s KB); '
+                 'collision risk %.1e', f'{self.count:,}', f'{used // 1024:,}',
+                 f'{dict_bytes // 1024:,}', self.collision_risk())
+
+    # --------------------------------------------------------------------------
+
+    def setdefault(self, values: tuple, key: int) -> int:
+        '''Return the key of the first record having the given values, adding
+           them with the given key if not already held.
+        Args:
+            values (tuple of strings) - duplicate-check values
+            key (int) - record key
+        Returns:
+            (int) - key of first record
+        '''
+        rv = self.get(values)
+        if rv is None:
+            self[values] = key
+            rv = key
+
+        return rv
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -0,0 +1,169 @@
+'''
+About  : Implements the DupeStore class which persists the duplicate-check
+         values of records between files and between runs in an SQLite
+         database, so that a record already seen in another file is skipped
+         as a duplicate. Only a 128-bit digest of the values is stored, together
+         with the file (full path) and key of the record which first produced
+         them.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+import os
+import sqlite3
+from typing import Final
+
+from dupeindex import DupeIndex
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+class DupeStore:
+    '''Class which maps digests of duplicate-check tuples to the file and key of
+       the first record having them. Offers the subset of the dict interface
+       used for de-duping (get and item assignment). Records of the current
+       file are held in memory until flushed.'''
+
+    BATCH: Final[int] = 500     # max. digests per lookup query
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, fn: str) -> None:
+        '''Constructor. Open the store, creating it if necessary.
+        Args:
+            fn (string) - path to duplicate store
+        Returns:
+            N/A
+        '''
+        self.fn: str = fn
+        self.file: str = ''                   # path of current file
+        self.pending: dict[bytes, int] = {}   # keys of current file's records
+        self.conn: sqlite3.Connection = sqlite3.connect(fn)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS dupes '
+                              '(digest BLOB PRIMARY KEY, file TEXT, key INTEGER) '
+                              'WITHOUT ROWID')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS dupes_file ON dupes (file)')
+        log.debug('Duplicate store %s holds %i records', fn, len(self))
+
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        '''Return the number of stored records (excluding those pending).'''
+        return self.conn.execute('SELECT COUNT(*) FROM dupes').fetchone()[0]
+
+    # --------------------------------------------------------------------------
+
+    def __setitem__(self, values: tuple, key: int) -> None:
+        '''Record the key of the first record having the given values, to be
+           written by the next flush.'''
+        self.add(DupeIndex.fingerprint(values), key)
+
+    # --------------------------------------------------------------------------
+
+    def add(self, digest: bytes, key: int) -> None:
+        '''Add a record of the current file, to be written by the next flush.
+        Args:
+            digest (bytes) - digest of duplicate-check values
+            key (int) - record key
+        Returns:
+            N/A
+        '''
+        self.pending.setdefault(digest, key)
+
+    # --------------------------------------------------------------------------
+
+    def close(self) -> None:
+        '''Write any pending records and close the store.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.flush()
+        self.conn.close()
+
+    # --------------------------------------------------------------------------
+
+    def flush(self) -> None:
+        '''Write pending records of the current file in a single transaction.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        if len(self.pending) == 0:
+            return
+        log.debug('Writing %i records to duplicate store', len(self.pending))
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO dupes VALUES (?, ?, ?)',
+                                  ((d, self.file, k) for d, k in self.pending.items()))
+        self.pending.clear()
+
+    # --------------------------------------------------------------------------
+
+    def get(self, values: tuple, default: int|str|None=None) -> int|str|None:
+        '''Return the first record having the given values.
+        Args:
+            values (tuple of strings) - duplicate-check values
+            default (int) - value returned if values not held
+        Returns:
+            (int|string) - key of record in current file, else "file: key" of
+                           record in earlier file, else default
+        '''
+        digest = DupeIndex.fingerprint(values)
+        key = self.pending.get(digest)
+        if key is not None:
+            return key
+
+        return self.lookup([digest]).get(digest, default)
+
+    # --------------------------------------------------------------------------
+
+    def lookup(self, digests: list[bytes]) -> dict[bytes, str]:
+        '''Look up the records of earlier files having a list of digests.
+        Args:
+            digests (list of bytes) - digests of duplicate-check values
+        Returns:
+            (dict) - "file: key" of each digest found in the store
+        '''
+        rv: dict[bytes, str] = {}
+        for i in range(0, len(digests), self.BATCH):
+            batch = digests[i:i + self.BATCH]
+            sql = ('SELECT digest, file, key FROM dupes WHERE digest IN '
+                   f'({",".join("?" * len(batch))})')
+            rv.update((d, f'{f}: {k}') for d, f, k in self.conn.execute(sql, batch))
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def set_file(self, fn: str) -> None:
+        '''Start de-duping the records of a file. Records stored by an earlier
+           run of the same file are removed, so that a file can be re-processed.
+           Files are identified by their full path (that of the archive plus 
+           the member name for a file within a zip archive), so that files of
+           the same name in different folders or archives are kept apart.
+        Args:
+            fn (string) - path to file
+        Returns:
+            N/A
+        '''
+        self.flush()
+        self.file = os.path.abspath(fn)
+        with self.conn:
+            n = self.conn.execute('DELETE FROM dupes WHERE file = ?',
+                                  (self.file,)).rowcount
+        if n > 0:
+            log.info('Removed %s records of earlier run of %s from duplicate store',
+                     f'{n:,}', self.file)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -5,15 +5,34 @@ About  : Implements the GeoRegion class which identifies in-scope records based
 
 # ------------------------------------------------------------------------------
 
+import json
 import logging
 import os
-from typing import Final
-import bng
-import geopandas as gpd
-import matplotlib.pyplot as plt
+import sqlite3
+from collections import OrderedDict
+from typing import Final, TypeAlias, TYPE_CHECKING
+import numpy as np
+import shapely
+from shapely import STRtree
 from shapely.geometry import Polygon
+from shapely.geometry.base import BaseGeometry
+from shapely.prepared import PreparedGeometry, prep
 
+import compiledregion
+import gridref as gr
+import regioncache
+import verdictstore
+from compiledregion import CompiledRegion
 from configmgr import ConfigMgr
+from squarestore import Square, SquareStore
+from tiledregion import TiledRegion
+from verdictstore import VerdictStore
+
+# geopandas (and fiona) are imported only when the shapefile must be read
+if TYPE_CHECKING:
+    import geopandas as gpd
+    from pyproj import Transformer
+    from matplotlib.axes import Axes
 
 # ------------------------------------------------------------------------------
 
@@ -21,6 +40,19 @@ log: logging.Logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------------------
 
+# Coarsest square (metres) subject to the region test. Coarser gridrefs fail the 
+# 'gridref' filter, so are not region tested to avoid double-counting.
+MAX_SQUARE: Final[int] = 1000
+# Allowance (metres) for error in reprojecting record lat/lon to the grid
+POINT_TOLERANCE: Final[int] = 20
+# Resolutions (metres) of the grid cells marking the region boundary band,
+# coarsest first
+BAND_LEVELS: Final[tuple[int, ...]] = (10000, 1000)
+# Result of a region test: (inside region, gridref square or None)
+Verdict: TypeAlias = tuple[bool, Square|None]
+
+# ------------------------------------------------------------------------------
+
 class GeoRegion:
     '''Class which performs point-in-polygon operation to identify those records
        within the target geographic region.'''
@@ -39,21 +71,156 @@ class GeoRegion:
         self.config: ConfigMgr = config                # instance of ConfigMgr class
         self.gdf_region: gpd.GeoDataFrame|None = None  # GeoDataFrame for region
         self.gs_region : gpd.GeoSeries|None = None     # GeoSeries for region
-        self.gs_inside: list[gpd.GeoSeries] = []   # list of objects inside region
-        self.gs_outside: list[gpd.GeoSeries] = []  # list of objects outside region
-        self.load_shape()
+        self.tree: STRtree|None = None                 # spatial index of region
+        self.compiled: CompiledRegion|None = None      # compiled region squares
+        self.crs: str|None = None                      # WKT of region CRS
+        self.key: str|None = None                      # fingerprint of GIS file
+        self.store: VerdictStore|None = None           # verdicts of earlier runs
+        # Prepared mode: unioned region, plus interior core for fast acceptance
+        self.region: BaseGeometry|None = None
+        self.region_bounds: tuple[float, float, float, float]|None = None
+        self.region_prep: PreparedGeometry|None = None
+        self.core_prep: PreparedGeometry|None = None
+        self.core_bounds: tuple[float, float, float, float]|None = None
+        # Points mode: spatial index of region boundary segments, reprojection
+        self.edges: STRtree|None = None
+        self.transformer: Transformer|None = None
+        # VC mode: summed-area tables of grid cells crossed by region boundary
+        # (True) and wholly inside it (False), plus grid origin
+        self.band: dict[bool, np.ndarray]|None = None
+        self.band_origin: tuple[int, int] = (0, 0)
+        # Multi-region mode: names of regions and spatial index of them, plus
+        # per-file table of the regions each gridref falls within
+        self.names: list[str] = []
+        self.named_tree: STRtree|None = None
+        self.routes: dict[str, tuple[str, ...]] = {}
+        # Tiled mode: quadtree tiles of region
+        self.tiles: TiledRegion|None = None
+        self.inside: SquareStore = SquareStore()   # gridrefs inside region
+        self.outside: SquareStore = SquareStore()  # gridrefs outside region
+        # Per-file table of region tests, keyed by normalised gridref
+        self.table: dict[str, Verdict] = {}
+        self.table_hits: int = 0
+        # Bounded (LRU) cache of region tests, keyed by normalised gridref
+        self.cache: OrderedDict[str, Verdict] = OrderedDict()
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.cache_evictions: int = 0
+        self.load_region()
         self.reset()
 
     # --------------------------------------------------------------------------
 
+    def classify_gridref(self, gridref: str) -> Verdict:
+        '''Perform the geometric test of whether a gridref is inside the region.
+        Args: 
+            gridref (string) - grid reference
+        Returns: 
+            (Verdict) - True if gridref within region, plus the gridref 
+                        square (None if gridref could not be converted)
+        '''
+        square = self.gridref_to_square(gridref)
+        if square is not None and self.is_loaded():
+            rv = self.square_in_region(square)
+        else:
+            # return True to avoid double-counting as 'gridref' filter will apply
+            rv = True
+            square = None
+
+        return rv, square
+
+    # --------------------------------------------------------------------------
+
+    def compile(self) -> str:
+        '''Classify the grid squares covering the region and save the results to
+           a compiled region file alongside the GIS shapefile.
+        Args: 
+            N/A
+        Returns: 
+            (string) - compiled region filename
+        Raises:
+            OSError exception if no GIS file has been specified.
+        '''
+        fn_gis = self.config.file_gis
+        if len(fn_gis) == 0:
+            raise OSError('No GIS file specified')
+        if self.tree is None:
+            self.load_shape()
+        region = (self.region if self.region is not None else
+                  shapely.union_all(self.gs_region.values)) # type: ignore
+        fn = compiledregion.get_filename(fn_gis)
+        CompiledRegion.compile(region, self.crs, fn, # type: ignore
+                               self.fingerprint())
+        return fn
+
+    # --------------------------------------------------------------------------
+
     def count(self) -> tuple[int, int]:
-        '''Return the number of members of the gs_inside and gs_outside lists.
+        '''Return the number of gridrefs found inside and outside the region.
+        Args: 
+            N/A
+        Returns: 
+            (tuple: int/int) - count of inside/outside gridrefs
+        '''
+        return self.inside.total, self.outside.total
+
+    # --------------------------------------------------------------------------
+
+    def fingerprint(self) -> str:
+        '''Return the fingerprint of the GIS shape file, calculating it on first
+           use.
         Args: 
             N/A
         Returns: 
-            (tuple: int/int) - count of members of inside/outside lists
+            (string) - fingerprint
         '''
-        return len(self.gs_inside), len(self.gs_outside)
+        if self.key is None:
+            self.key = regioncache.fingerprint(self.config.file_gis)
+
+        return self.key
+
+    # --------------------------------------------------------------------------
+
+    def get_output_filename(self, filename: str, suffix: str) -> str:
+        '''Return the path of an output file associated with an input file.
+        Args: 
+            filename (string) - input filename
+            suffix (string) - text (including extension) to add to base filename
+        Returns: 
+            (string) - output path (e.g. <Folder_Output>/<base><suffix>)
+        '''
+        fb = os.path.splitext(os.path.basename(filename))[0]
+        return os.path.join(self.config.dir_data_out, fb + suffix)
+
+    # --------------------------------------------------------------------------
+
+    def get_verdict(self, key: str) -> Verdict:
+        '''Return the region test result of a normalised gridref, from the 
+           per-file table if loaded, else the cache, else by testing geometry.
+        Args: 
+            key (string) - normalised grid reference
+        Returns: 
+            (Verdict) - True if gridref within region, plus the gridref 
+                        square (None if gridref could not be converted)
+        '''
+        verdict = self.table.get(key)
+        if verdict is not None:
+            self.table_hits += 1
+        else:
+            verdict = self.cache.get(key)
+            if verdict is not None:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+            else:
+                self.cache_misses += 1
+                verdict = self.stored_gridref(key)
+                if self.config.region_cache_size > 0:
+                    self.cache[key] = verdict
+                    if len(self.cache) > self.config.region_cache_size:
+                        self.cache.popitem(last=False)
+                        self.cache_evictions += 1
+
+        return verdict
 
     # --------------------------------------------------------------------------
 
@@ -64,19 +231,29 @@ class GeoRegion:
         Returns: 
             (bool) - True if gridref within region
         '''
-        poly = self.gridref_to_polygon(gridref)
-        if poly is not None and self.gs_region is not None:
-            gs_gridref = gpd.GeoSeries([poly], crs=self.gdf_region.crs) # type: ignore
-            intersects = self.gs_region.intersects(gs_gridref)
-            rv = intersects.any()
-            # Add GeoSeries to relevant list for future use
+        rv, square = self.get_verdict(self.normalise_gridref(gridref))
+        # Add square to relevant store for future use
+        if square is not None:
             if rv:
-                self.gs_inside.append(gs_gridref)
+                self.inside.add(square)
             else:
-                self.gs_outside.append(gs_gridref)
-        else:
-            # return True to avoid double-counting as 'gridref' filter will apply
-            rv = True
+                self.outside.add(square)
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def gridref_regions(self, gridref: str) -> tuple[str, ...]:
+        '''Return the names of the regions within which a gridref falls.
+        Args: 
+            gridref (string) - grid reference
+        Returns: 
+            (tuple of strings) - region names (empty if none or invalid gridref)
+        '''
+        key = self.normalise_gridref(gridref)
+        rv = self.routes.get(key)
+        if rv is None:
+            rv = self.routes[key] = self.gridrefs_regions([key])[0]
 
         return rv
 
@@ -89,40 +266,193 @@ class GeoRegion:
         Returns: 
             (Polygon) - equivalent Polygon object
         '''
-        try:
-            e_l, n_l = bng.to_osgb36(gridref)
-            l = len(gridref)
-            if l == 4:
-                s = 10000
-            elif l == 6:
-                s = 1000
-            elif l == 8:
-                s = 100
-            elif l == 10:
-                s = 10
-            else:
-                s = 100
-                log.error('Unable to convert grid reference: %s', gridref)
+        square = self.gridref_to_square(gridref)
+        return self.square_to_polygon(square) if square is not None else None
 
-            e_u = e_l + s
-            n_u = n_l + s
+    # --------------------------------------------------------------------------
 
-            p = Polygon([(e_l, n_l),
-                        (e_l, n_u),
-                        (e_u, n_u),
-                        (e_u, n_l)])
-        except bng.BNGError as ex:
+    def gridref_to_square(self, gridref: str) -> Square|None:
+        '''Convert a supplied grid reference to a grid square for region testing.
+        Args: 
+            gridref (string) - grid reference
+        Returns: 
+            (Square) - (easting, northing, size), else None if invalid or 
+                       coarser than MAX_SQUARE
+        '''
+        square = self.gridrefs_to_squares([gridref])[0]
+        if square is None:
             # Invalid format gridref, including too short - e.g. 'SJ78'
             log.debug('Unable to convert gridref: %s', gridref)
-            log.debug(ex)
-            p = None
 
-        return p
+        return square
+
+    # --------------------------------------------------------------------------
+
+    def gridrefs_in_region(self, gridrefs: list[str]) -> np.ndarray:
+        '''Determine whether each of a list of gridrefs is inside the region, 
+           using a single spatial index query.
+        Args: 
+            gridrefs (list of strings) - grid references
+        Returns: 
+            (numpy array of bool) - True if gridref within region (or invalid)
+        '''
+        return self.squares_in_region(self.gridrefs_to_squares(gridrefs))
+
+    # --------------------------------------------------------------------------
+
+    def gridrefs_regions(self, gridrefs: list[str]) -> list[tuple[str, ...]]:
+        '''Return the names of the regions within which each of a list of 
+           gridrefs falls, using a single spatial index lookup. Unlike the 
+           region test, squares coarser than 1km are also assigned.
+        Args: 
+            gridrefs (list of strings) - grid references
+        Returns: 
+            (list of tuples of strings) - region names for each gridref
+        '''
+        rv: list[list[str]] = [[] for _ in gridrefs]
+        if self.named_tree is None or len(gridrefs) == 0:
+            return [tuple(r) for r in rv]
+        e, n, size, valid = gr.decode(gridrefs)
+        ix = np.flatnonzero(valid)
+        boxes = shapely.box(e[ix], n[ix], e[ix] + size[ix], n[ix] + size[ix])
+        i_box, i_name = self.named_tree.query(boxes, predicate='intersects')
+        for i, j in sorted(zip(ix[i_box].tolist(), i_name.tolist())):
+            rv[i].append(self.names[j])
+
+        return [tuple(r) for r in rv]
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def gridrefs_to_squares(gridrefs: list[str]) -> list[Square|None]:
+        '''Convert a list of grid references to grid squares for region testing.
+        Args: 
+            gridrefs (list of strings) - grid references
+        Returns: 
+            (list of Square/None) - (easting, northing, size), else None if 
+                                    invalid or coarser than MAX_SQUARE
+        '''
+        e, n, size, valid = gr.decode(gridrefs)
+        valid &= size <= MAX_SQUARE
+        return [(x, y, z) if v else None for x, y, z, v in
+                zip(e.tolist(), n.tolist(), size.tolist(), valid.tolist())]
+
+    # --------------------------------------------------------------------------
+
+    def is_loaded(self) -> bool:
+        '''Return True if a region has been loaded.
+        Args: 
+            N/A
+        Returns: 
+            (bool) - True if region loaded, else False
+        '''
+        return self.tree is not None or self.compiled is not None
+
+    # --------------------------------------------------------------------------
+
+    def log_cache_stats(self) -> None:
+        '''Write gridref table and cache statistics to log.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        if self.table_hits > 0:
+            log.info('Gridref table hits: %s', f'{self.table_hits:,}')
+        lookups = self.cache_hits + self.cache_misses
+        rate = 100 * self.cache_hits / lookups if lookups > 0 else 0
+        log.info('Gridref cache hits: %s, misses: %s, evictions: %s (%s hit rate)',
+                 f'{self.cache_hits:,}', f'{self.cache_misses:,}',
+                 f'{self.cache_evictions:,}', f'{rate:.1f}%')
+
+    # --------------------------------------------------------------------------
+
+    def load_compiled(self, compiled: CompiledRegion) -> None:
+        '''Use a loaded compiled region file. The region geometry it contains is
+           used for the rare squares which cannot be resolved from the compiled
+           data, and is only prepared when first needed.
+        Args: 
+            compiled (CompiledRegion) - compiled region
+        Returns: 
+            N/A
+        '''
+        log.debug('Using compiled region file: %s', compiled.fn)
+        self.compiled = compiled
+        self.crs = self.compiled.crs
+        if self.config.region_tiled is True or self.config.region_points is True:
+            self.require_region()
+        if self.config.region_tiled is True:
+            self.tile_region(self.region) # type: ignore
+        if self.config.region_points is True:
+            self.prepare_points(self.region) # type: ignore
+
+    # --------------------------------------------------------------------------
+
+    def load_names(self) -> None:
+        '''Load the named regions making up the GIS shape file, grouping its 
+           features by the RegionField attribute.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        import geopandas as gpd  # pylint: disable=import-outside-toplevel
+
+        field = self.config.region_field
+        gdf = (self.gdf_region if self.gdf_region is not None else
+               gpd.read_file(self.config.file_gis))
+        if field not in gdf.columns:
+            log.error('GIS file has no field "%s" with which to name regions', field)
+            return
+        names = gdf[field].astype(str).str.strip().to_numpy()
+        geoms = gdf['geometry'].to_numpy()
+        self.names = sorted(set(names))
+        self.named_tree = STRtree([shapely.union_all(geoms[names == name])
+                                   for name in self.names])
+        log.info('Number of named regions: %i', len(self.names))
+
+    # --------------------------------------------------------------------------
+
+    def load_region(self) -> None:
+        '''Load the region, from the compiled region file if so configured and
+           available, else from the GIS shape file.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        fn = self.config.file_gis
+        if len(fn) == 0:
+            log.info('No GIS file specified')
+            return
+        if self.config.region_compiled is True:
+            fn_c = compiledregion.get_filename(fn)
+            compiled = CompiledRegion(fn_c) if os.path.isfile(fn_c) else None
+            if compiled is not None and compiled.fingerprint == self.fingerprint():
+                self.load_compiled(compiled)
+            else:
+                log.warning('Compiled region file is missing or out of date (use '
+                            'the --compile option to create): %s', fn_c)
+        if self.compiled is not None and len(self.config.region_vcs) > 0:
+            log.warning('RegionVC is ignored when the compiled region file is '
+                        'used (its squares already resolve records away from '
+                        'the boundary)')
+        if self.compiled is None:
+            self.load_shape()
+        if len(self.config.region_field) > 0:
+            self.load_names()
+        if self.config.region_verdict_store is True:
+            fn_v = verdictstore.get_filename(fn)
+            try:
+                self.store = VerdictStore(fn_v, self.fingerprint())
+            except (OSError, sqlite3.Error) as ex:
+                log.warning('Could not open verdict store (%s): %s', ex, fn_v)
 
     # --------------------------------------------------------------------------
 
     def load_shape(self):
-        '''Load the GIS shape file.
+        '''Load the GIS shape file, or its cached geometry if so configured and
+           the shape file is unchanged since the cache was written.
         Args: 
             N/A
         Returns: 
@@ -132,15 +462,130 @@ class GeoRegion:
         if len(fn) == 0:
             log.info('No GIS file specified')
             return
-        log.debug('Loading GIS file: %s', fn)
-        self.gdf_region = gpd.read_file(fn)
-        if self.gdf_region is not None:
+        region: BaseGeometry|None = None
+        key = self.fingerprint() if self.config.region_geometry_cache else None
+        cached = regioncache.load(fn, key) if key is not None else None
+        if cached is not None:
+            region, self.crs = cached
+        else:
+            import geopandas as gpd  # pylint: disable=import-outside-toplevel
+            log.debug('Loading GIS file: %s', fn)
+            self.gdf_region = gpd.read_file(fn)
+            if self.gdf_region is None:
+                return
             self.gs_region = self.gdf_region['geometry'] # type: ignore
+            self.crs = self.gdf_region.crs.to_wkt() # type: ignore
+            if (key is not None or self.config.region_prepared is True or
+                    self.config.region_tiled is True or
+                    self.config.region_points is True or
+                    len(self.config.region_vcs) > 0):
+                region = shapely.union_all(self.gs_region.values) # type: ignore
+            if key is not None:
+                regioncache.save(fn, key, region, self.crs) # type: ignore
+        self.region = region
+        self.tree = STRtree(self.gs_region.values if self.gs_region is not None # type: ignore
+                            else shapely.get_parts(region))
+        if self.config.region_prepared is True:
+            self.prepare_region(region) # type: ignore
+        if self.config.region_tiled is True:
+            self.tile_region(region) # type: ignore
+        if self.config.region_points is True:
+            self.prepare_points(region) # type: ignore
+        if len(self.config.region_vcs) > 0:
+            self.prepare_band(region) # type: ignore
+
+    # --------------------------------------------------------------------------
+
+    def load_table(self, gridrefs: list[str],
+                   coords: tuple[list[str], list[str], list[str]]|None=None,
+                   vcs: tuple[list[str], list[str]]|None=None,
+                   rejected: np.ndarray|None=None) -> None:
+        '''Classify the distinct gridrefs of a file in bulk and store the results
+           for subsequent use by gridref_in_region. If the coordinates (with
+           RegionPoints set) or VC attribution (with RegionVC set) of each 
+           record are supplied, gridrefs resolved from one of their records in
+           this way need no square test.
+        Args: 
+            gridrefs (list of strings) - grid references contained in file
+            coords (tuple of lists of strings) - latitude, longitude and
+                                                 precision (metres) of each record
+            vcs (tuple of lists of strings) - VC number and precision (metres) 
+                                              of each record
+            rejected (numpy array of bool) - records skipped whatever their
+                                             location, so needing no region test
+        Returns: 
+            N/A
+        '''
+        self.table.clear()
+        if self.config.region_batch is False or not self.is_loaded():
+            return
+        if rejected is not None:
+            keep = np.flatnonzero(~rejected)
+            gridrefs = [gridrefs[i] for i in keep]
+            if coords is not None:
+                coords = tuple([v[i] for i in keep] for v in coords) # type: ignore
+            if vcs is not None:
+                vcs = tuple([v[i] for i in keep] for v in vcs) # type: ignore
+            log.debug('Records needing region test: %i', len(keep))
+        rows = [self.normalise_gridref(g) for g in gridrefs]
+        keys = list(dict.fromkeys(rows))
+        log.debug('Classifying %i distinct gridrefs', len(keys))
+        if self.named_tree is not None:
+            self.routes = dict(zip(keys, self.gridrefs_regions(keys)))
+        squares = self.gridrefs_to_squares(keys)
+        inside = np.ones(len(keys), dtype=bool)
+        todo = np.array([sq is not None for sq in squares], dtype=bool)
+        if self.store is not None:
+            known = self.store.lookup(keys)
+            for i, k in enumerate(keys):
+                if k in known:
+                    inside[i] = known[k]
+                    todo[i] = False
+            log.debug('%i distinct gridrefs found in verdict store', len(known))
+        new = todo.copy()
+        use_points = coords is not None and self.edges is not None
+        use_vcs = vcs is not None and self.band is not None
+        if (use_points or use_vcs) and todo.any():
+            index = {k: i for i, k in enumerate(keys)}
+            ix = np.array([index[k] for k in rows], dtype=int)
+            sq = np.array([s if s is not None else (0, 0, 0) for s in squares],
+                          dtype=np.int64)[ix]
+            rv = np.full(len(rows), -1, dtype=np.int8)
+            if use_points:
+                rv = self.points_in_region(sq, *coords) # type: ignore
+            if use_vcs:
+                rv = np.where(rv >= 0, rv, self.vcs_in_region(sq, *vcs)) # type: ignore
+            done = (rv >= 0) & todo[ix]
+            inside[ix[done]] = rv[done] == 1
+            todo[ix[done]] = False
+            log.debug('%i distinct gridrefs resolved from record attributes',
+                      int(new.sum() - todo.sum()))
+        pending = np.flatnonzero(todo)
+        if len(pending) > 0:
+            inside[pending] = self.squares_in_region([squares[i] for i in pending])
+        if self.store is not None:
+            for i in np.flatnonzero(new):
+                self.store.add(keys[i], bool(inside[i]))
+        self.table = {k: (bool(rv), sq) for k, rv, sq in zip(keys, inside, squares)}
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def normalise_gridref(gridref: str) -> str:
+        '''Return a gridref in canonical form for use as a cache key.
+        Args: 
+            gridref (string) - grid reference
+        Returns: 
+            (string) - upper case grid reference without spaces
+        '''
+        return gridref.replace(' ', '').upper()
 
     # --------------------------------------------------------------------------
 
     def plot(self, filename: str) -> None:
-        '''Plot map showing region and polygons inside/outside the region.
+        '''Plot map showing region and polygons inside/outside the region. In
+           headless mode, save the map as a PNG file and the polygons outside
+           the region as a GeoJSON file, rather than displaying the map.
         Args: 
             filename (string) - filename associated with data
         Returns: 
@@ -149,29 +594,271 @@ class GeoRegion:
         # Only plot if config flag is set to True
         if self.config.plot is False:
             return
+        # pylint: disable=import-outside-toplevel
+        from matplotlib.collections import LineCollection, PolyCollection
+        from matplotlib.figure import Figure
+        # pylint: enable=import-outside-toplevel
+
         log.info('Generating plot')
         # Region
-        if self.gdf_region is None:
+        self.require_region()
+        if self.gs_region is not None:
+            geoms = self.gs_region.values
+        elif self.region is not None:
+            geoms = np.array([self.region], dtype=object)
+        else:
             log.info('No region to plot')
             return
-        base = self.gdf_region.plot(linewidth=1, edgecolor='black',
-                                    facecolor='white', legend=True)
-        # Inside region
+        if self.config.plot_headless is True:
+            fig = Figure()
+        else:
+            import matplotlib.pyplot as plt  # pylint: disable=import-outside-toplevel
+            fig = plt.figure()
+        ax: Axes = fig.add_subplot()
+        parts = shapely.get_parts(geoms)
+        ax.add_collection(PolyCollection(
+            [shapely.get_coordinates(p.exterior) for p in parts],
+            linewidth=1, edgecolor='black', facecolor='white'))
+        ax.add_collection(LineCollection(
+            [shapely.get_coordinates(r) for p in parts for r in p.interiors],
+            linewidth=1, color='black'))
+        # Inside/outside region - each drawn as a single collection
+        ax.add_collection(PolyCollection(self.inside.vertices(),
+                                         edgecolor='red', facecolor='none'))
+        ax.add_collection(PolyCollection(self.outside.vertices(),
+                                         edgecolor='blue', facecolor='none'))
+        ax.autoscale_view()
+        ax.set_aspect('equal')
+
+        title = (f'VC58 - External Gridref Count: {self.outside.total} '
+                 f'(>= 4 digits)\nFile: {os.path.basename(filename)}')
+        ax.set_title(title)
+        fig.tight_layout()
+        if self.config.plot_headless is True:
+            fn = self.get_output_filename(filename, '_outside.png')
+            log.info('Writing plot file: %s', fn)
+            fig.savefig(fn)
+            self.write_outside(self.get_output_filename(filename,
+                                                        '_outside.geojson'))
+        else:
+            plt.ion()   # interactive on - non-blocking
+            plt.show()
+
+    # --------------------------------------------------------------------------
+
+    def points_in_region(self, squares: np.ndarray, lat: list[str], lon: list[str],
+                         precision: list[str]) -> np.ndarray:
+        '''Determine whether records are inside the region from their lat/lon.
+           A record is only resolved if its point lies within its gridref square
+           and the region boundary is further from the point than both its 
+           precision and the far corners of the square, in which case the 
+           square lies wholly on the same side of the boundary as the point.
+        Args: 
+            squares (numpy array) - gridref square of each record, shape 
+                                    (records, 3), size 0 if invalid
+            lat (list of strings) - latitude of each record (WGS84)
+            lon (list of strings) - longitude of each record (WGS84)
+            precision (list of strings) - precision of each record (metres)
+        Returns: 
+            (numpy array of int8) - 1 if inside region, 0 if outside, -1 if
+                                    unresolved (square test required)
+        '''
+        from pyproj import CRS, Transformer  # pylint: disable=import-outside-toplevel
+
+        if self.transformer is None:
+            self.transformer = Transformer.from_crs(
+                'EPSG:4326', CRS.from_wkt(self.crs), always_xy=True) # type: ignore
+        x, y = self.transformer.transform(self.to_float(lon), self.to_float(lat))
+        e0, n0, size = (squares[:, i].astype(float) for i in range(3))
+        e1, n1 = e0 + size, n0 + size
+        tol = POINT_TOLERANCE
+        ok = (np.isfinite(x) & np.isfinite(y) & (size > 0) &
+              (x >= e0 - tol) & (x <= e1 + tol) & (y >= n0 - tol) & (y <= n1 + tol))
+        far = np.hypot(np.maximum(np.abs(x - e0), np.abs(x - e1)),
+                       np.maximum(np.abs(y - n0), np.abs(y - n1)))
+        margin = np.fmax(far, self.to_float(precision)) + tol
+        rv = np.full(len(squares), -1, dtype=np.int8)
+        ix = np.flatnonzero(ok)
+        near = self.edges.query(shapely.points(x[ix], y[ix]), # type: ignore
+                                predicate='dwithin', distance=margin[ix])[0]
+        ix = np.delete(ix, np.unique(near))
+        rv[ix] = shapely.contains_xy(self.region, x[ix], y[ix]) # type: ignore
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def polygons_in_region(self, polys: list[Polygon|None]) -> np.ndarray:
+        '''Determine whether each of a list of gridref polygons is inside the 
+           region, using a single vectorised operation.
+        Args: 
+            polys (list of Polygon/None) - gridref polygons (None if invalid)
+        Returns: 
+            (numpy array of bool) - True if polygon within region (or None)
         '''
-        # Takes a long time valid points, so comment-out unless required...
-        for gs in self.gs_inside:
-            gs.plot(ax=base, edgecolor='red')
+        # Invalid gridrefs are treated as inside - 'gridref' filter will apply
+        rv = np.ones(len(polys), dtype=bool)
+        ix_valid = np.array([i for i, p in enumerate(polys) if p is not None],
+                            dtype=int)
+        if len(ix_valid) == 0:
+            return rv
+        geoms = np.array([polys[i] for i in ix_valid], dtype=object)
+        self.require_region()
+        if self.tiles is not None:
+            rv[ix_valid] = self.tiles.intersects(geoms)
+        elif self.region_prep is not None:
+            rv[ix_valid] = self.prepared_in_region_array(geoms)
+        elif self.tree is not None:
+            hits = self.tree.query(geoms, predicate='intersects')
+            rv[ix_valid] = False
+            rv[ix_valid[np.unique(hits[0])]] = True
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def prepare_band(self, region: BaseGeometry) -> None:
+        '''Classify the grid cells covering the (unioned) region as crossed by 
+           the region boundary, or wholly inside or outside it, for resolving
+           records well away from the boundary. Cells at each level are only
+           tested if their parent is crossed.
+        Args: 
+            region (BaseGeometry) - region geometry
+        Returns: 
+            N/A
         '''
-        # Outside region
-        for gs in self.gs_outside:
-            gs.plot(ax=base, edgecolor='blue')
+        log.debug('Marking region boundary band')
+        boundary = shapely.boundary(region)
+        shapely.prepare(boundary)
+        shapely.prepare(region)
+        # Grid origin/extent, padded by one coarse cell on each side
+        top = BAND_LEVELS[0]
+        xmin, ymin, xmax, ymax = region.bounds
+        x0 = int(xmin // top) * top - top
+        y0 = int(ymin // top) * top - top
+        shape = (int((ymax - y0) // top) + 2, int((xmax - x0) // top) + 2)
+        crossed = np.ones(shape, dtype=bool)
+        inside = np.zeros(shape, dtype=bool)
+        prev = top
+        for lvl in BAND_LEVELS:
+            f = prev // lvl
+            crossed = np.repeat(np.repeat(crossed, f, axis=0), f, axis=1)
+            inside = np.repeat(np.repeat(inside, f, axis=0), f, axis=1)
+            iy, ix = np.nonzero(crossed)
+            x, y = x0 + ix * lvl, y0 + iy * lvl
+            crossed[iy, ix] = shapely.intersects(boundary,
+                                                 shapely.box(x, y, x + lvl, y + lvl))
+            inside[iy, ix] = shapely.contains_xy(region, x + lvl / 2, y + lvl / 2)
+            prev = lvl
+        log.debug('%i of %i cells of %im cross region boundary',
+                  int(crossed.sum()), crossed.size, prev)
+        self.band = {c: np.pad(g.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+                     for c, g in ((True, crossed), (False, inside & ~crossed))}
+        self.band_origin = (x0, y0)
 
-        title = (f'VC58 - External Gridref Count: {len(self.gs_outside)} '
-                 f'(>= 4 digits)\nFile: {os.path.basename(filename)}')
-        plt.title(title)
-        plt.tight_layout()
-        plt.ion()   # interactive on - non-blocking
-        plt.show()
+    # --------------------------------------------------------------------------
+
+    def prepare_points(self, region: BaseGeometry) -> None:
+        '''Build a spatial index of the segments of the (unioned) region 
+           boundary, for measuring the distance of records from the boundary.
+        Args: 
+            region (BaseGeometry) - region geometry
+        Returns: 
+            N/A
+        '''
+        log.debug('Indexing region boundary')
+        self.region = region
+        shapely.prepare(region)
+        rings = shapely.get_rings(shapely.get_parts(region))
+        coords, ring = shapely.get_coordinates(rings, return_index=True)
+        same = ring[1:] == ring[:-1]
+        self.edges = STRtree(shapely.linestrings(
+            np.stack([coords[:-1][same], coords[1:][same]], axis=1)))
+
+    # --------------------------------------------------------------------------
+
+    def prepare_region(self, region: BaseGeometry, core: bool=True) -> None:
+        '''Prepare the (unioned) region geometry, and optionally build a prepared 
+           interior core (region shrunk by RegionCoreBuffer metres).
+        Args: 
+            region (BaseGeometry) - region geometry
+            core (bool) - build interior core
+        Returns: 
+            N/A
+        '''
+        log.debug('Preparing region geometry')
+        self.region = region
+        self.region_bounds = self.region.bounds
+        self.region_prep = prep(self.region)
+        self.core_prep = self.core_bounds = None
+        if core and self.config.region_core_buffer > 0:
+            core = self.region.buffer(-self.config.region_core_buffer)
+            if not core.is_empty:
+                self.core_bounds = core.bounds
+                self.core_prep = prep(core)
+
+    # --------------------------------------------------------------------------
+
+    def prepared_in_region(self, poly: Polygon) -> bool:
+        '''Determine whether a polygon is inside the prepared region. Reject if
+           outside the region envelope, accept if within the interior core, else
+           perform the full intersects test.
+        Args: 
+            poly (Polygon) - gridref polygon
+        Returns: 
+            (bool) - True if polygon intersects region
+        '''
+        xmin, ymin, xmax, ymax = poly.bounds
+        rxmin, rymin, rxmax, rymax = self.region_bounds # type: ignore
+        if xmax < rxmin or xmin > rxmax or ymax < rymin or ymin > rymax:
+            return False
+        if self.core_prep is not None:
+            cxmin, cymin, cxmax, cymax = self.core_bounds # type: ignore
+            if (xmin >= cxmin and xmax <= cxmax and ymin >= cymin and
+                    ymax <= cymax and self.core_prep.contains(poly)):
+                return True
+
+        return self.region_prep.intersects(poly) # type: ignore
+
+    # --------------------------------------------------------------------------
+
+    def prepared_in_region_array(self, geoms: np.ndarray) -> np.ndarray:
+        '''Vectorised equivalent of prepared_in_region.
+        Args: 
+            geoms (numpy array of Polygon) - gridref polygons
+        Returns: 
+            (numpy array of bool) - True if polygon intersects region
+        '''
+        b = shapely.bounds(geoms)
+        rxmin, rymin, rxmax, rymax = self.region_bounds # type: ignore
+        rv = np.zeros(len(geoms), dtype=bool)
+        todo = ~((b[:, 2] < rxmin) | (b[:, 0] > rxmax) |
+                 (b[:, 3] < rymin) | (b[:, 1] > rymax))
+        if self.core_prep is not None:
+            cxmin, cymin, cxmax, cymax = self.core_bounds # type: ignore
+            in_box = todo & ((b[:, 0] >= cxmin) & (b[:, 2] <= cxmax) &
+                             (b[:, 1] >= cymin) & (b[:, 3] <= cymax))
+            ix = np.flatnonzero(in_box)
+            rv[ix] = shapely.contains(self.core_prep.context, geoms[ix])
+            todo &= ~rv
+        ix = np.flatnonzero(todo)
+        rv[ix] = shapely.intersects(self.region_prep.context, geoms[ix]) # type: ignore
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def require_region(self) -> None:
+        '''Prepare the region geometry held in the compiled region file, if it
+           has not yet been needed.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        if (self.compiled is not None and self.tree is None and
+                self.region_prep is None):
+            self.prepare_region(shapely.from_wkb(self.compiled.wkb), core=False)
 
     # --------------------------------------------------------------------------
 
@@ -182,8 +869,237 @@ class GeoRegion:
         Returns: 
             N/A
         '''
-        self.gs_inside.clear()
-        self.gs_outside.clear()
+        self.inside.clear()
+        self.outside.clear()
+        self.table.clear()
+        self.routes.clear()
+        self.table_hits = 0
+        self.cache_hits = self.cache_misses = self.cache_evictions = 0
+
+    # --------------------------------------------------------------------------
+
+    def save_verdicts(self) -> None:
+        '''Write the verdicts of newly classified gridrefs to the verdict store.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        if self.store is not None:
+            self.store.flush()
+
+    # --------------------------------------------------------------------------
+
+    def square_in_region(self, square: Square) -> bool:
+        '''Determine whether a grid square is inside the region.
+        Args: 
+            square (Square) - grid square
+        Returns: 
+            (bool) - True if square intersects region
+        '''
+        if self.compiled is not None:
+            rv = self.compiled.square_in_region(*square)
+            if rv is not None:
+                return rv
+        poly = self.square_to_polygon(square)
+        self.require_region()
+        if self.tiles is not None:
+            return bool(self.tiles.intersects(np.array([poly]))[0])
+        if self.region_prep is not None:
+            return self.prepared_in_region(poly)
+
+        return len(self.tree.query(poly, predicate='intersects')) > 0 # type: ignore
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def square_to_polygon(square: Square) -> Polygon:
+        '''Convert a grid square to a Polygon (eastings/northings).
+        Args: 
+            square (Square) - grid square
+        Returns: 
+            (Polygon) - equivalent Polygon object
+        '''
+        e_l, n_l, s = square
+        e_u = e_l + s
+        n_u = n_l + s
+
+        return Polygon([(e_l, n_l),
+                        (e_l, n_u),
+                        (e_u, n_u),
+                        (e_u, n_l)])
+
+    # --------------------------------------------------------------------------
+
+    def squares_in_region(self, squares: list[Square|None]) -> np.ndarray:
+        '''Determine whether each of a list of grid squares is inside the region.
+           Squares not resolved by the compiled region (if loaded) are tested
+           geometrically in a single vectorised operation.
+        Args: 
+            squares (list of Square/None) - grid squares (None if invalid)
+        Returns: 
+            (numpy array of bool) - True if square within region (or None)
+        '''
+        rv = np.ones(len(squares), dtype=bool)
+        pending: list[int] = []
+        for i, square in enumerate(squares):
+            if square is None:
+                continue
+            inside = (self.compiled.square_in_region(*square)
+                      if self.compiled is not None else None)
+            if inside is None:
+                pending.append(i)
+            else:
+                rv[i] = inside
+        if len(pending) > 0:
+            e, n, size = np.array([squares[i] for i in pending]).T
+            rv[pending] = self.polygons_in_region(
+                list(shapely.box(e, n, e + size, n + size)))
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def stored_gridref(self, gridref: str) -> Verdict:
+        '''Return the verdict of a gridref from the verdict store if present,
+           else classify it (adding the result to the store).
+        Args: 
+            gridref (string) - normalised grid reference
+        Returns: 
+            (Verdict) - True if gridref within region, plus the gridref 
+                        square (None if gridref could not be converted)
+        '''
+        if self.store is None:
+            return self.classify_gridref(gridref)
+        inside = self.store.lookup([gridref]).get(gridref)
+        if inside is not None:
+            return inside, self.gridref_to_square(gridref)
+        rv, square = self.classify_gridref(gridref)
+        if square is not None:
+            self.store.add(gridref, rv)
+
+        return rv, square
+
+    # --------------------------------------------------------------------------
+
+    def tally_gridrefs(self, gridrefs: list[str]) -> np.ndarray:
+        '''Determine whether each of a list of gridrefs is inside the region,
+           updating the inside/outside counts as calling gridref_in_region for
+           each would, but testing each distinct gridref only once.
+        Args: 
+            gridrefs (list of strings) - grid references
+        Returns: 
+            (numpy array of bool) - True if gridref within region
+        '''
+        index: dict[str, int] = {}
+        ix = np.array([index.setdefault(self.normalise_gridref(g), len(index))
+                       for g in gridrefs], dtype=int)
+        counts = np.bincount(ix, minlength=len(index))
+        inside = np.empty(len(index), dtype=bool)
+        for i, key in enumerate(index):
+            rv, square = self.get_verdict(key)
+            inside[i] = rv
+            if square is not None:
+                (self.inside if rv else self.outside).add(square, int(counts[i]))
+
+        return inside[ix]
+
+    # --------------------------------------------------------------------------
+
+    def tile_region(self, region: BaseGeometry) -> None:
+        '''Split the (unioned) region geometry into quadtree tiles of at most
+           RegionTileVertices vertices each.
+        Args: 
+            region (BaseGeometry) - region geometry
+        Returns: 
+            N/A
+        '''
+        log.debug('Tiling region geometry')
+        self.tiles = TiledRegion(region, self.config.region_tile_vertices)
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def to_float(values: list[str]) -> np.ndarray:
+        '''Convert a list of numeric strings to floats.
+        Args: 
+            values (list of strings) - numeric strings
+        Returns: 
+            (numpy array of float) - values (NaN if not numeric)
+        '''
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        return pd.to_numeric(pd.Series(values, dtype=object),
+                             errors='coerce').to_numpy(dtype=float)
+
+    # --------------------------------------------------------------------------
+
+    def vcs_in_region(self, squares: np.ndarray, vcs: list[str], 
+                      precision: list[str]) -> np.ndarray:
+        '''Determine whether records are inside the region from their VC
+           attribution, without any geometry. A record is only resolved if its 
+           gridref square, widened by its precision, touches no cell of the
+           boundary band, so lies wholly inside (or outside) the region, and its
+           VC number agrees (is, or is not, one of the RegionVC numbers).
+        Args: 
+            squares (numpy array) - gridref square of each record, shape 
+                                    (records, 3), size 0 if invalid
+            vcs (list of strings) - VC number of each record
+            precision (list of strings) - precision of each record (metres)
+        Returns: 
+            (numpy array of int8) - 1 if inside region, 0 if outside, -1 if
+                                    unresolved (square test required)
+        '''
+        p = np.nan_to_num(self.to_float(precision), nan=0.0)
+        e, n, size = (squares[:, i].astype(float) for i in range(3))
+        lvl = BAND_LEVELS[-1]
+        x0, y0 = self.band_origin
+        ny, nx = (d - 1 for d in self.band[True].shape) # type: ignore
+        # Cells overlapping the box, including those only touching its edges
+        ix0 = np.clip(np.floor((e - p - x0) / lvl).astype(np.int64), 0, nx)
+        iy0 = np.clip(np.floor((n - p - y0) / lvl).astype(np.int64), 0, ny)
+        ix1 = np.clip(np.floor((e + size + p - x0) / lvl).astype(np.int64) + 1, 0, nx)
+        iy1 = np.clip(np.floor((n + size + p - y0) / lvl).astype(np.int64) + 1, 0, ny)
+        crossed, inside = (s[iy1, ix1] - s[iy0, ix1] - s[iy1, ix0] + s[iy0, ix0]
+                           for s in self.band.values()) # type: ignore
+        vc = np.array([v.strip() for v in vcs], dtype=str)
+        target = np.isin(vc, list(self.config.region_vcs))
+        # Cells wholly inside and outside are always separated by crossed cells
+        clear = (size > 0) & (crossed == 0)
+        rv = np.full(len(squares), -1, dtype=np.int8)
+        rv[clear & (inside > 0) & target] = 1
+        rv[clear & (inside == 0) & ~target & (vc != '')] = 0
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def write_outside(self, fn: str) -> None:
+        '''Write the gridref squares outside the region to a GeoJSON file.
+        Args: 
+            fn (string) - GeoJSON filename
+        Returns: 
+            N/A
+        '''
+        log.info('Writing outside gridrefs file: %s', fn)
+        squares, counts = self.outside.arrays()
+        features = []
+        for (e, n, s), c in zip(squares.tolist(), counts.tolist()):
+            ring = [[e, n], [e, n + s], [e + s, n + s], [e + s, n], [e, n]]
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                'properties': {'easting': e, 'northing': n, 'size': s, 'count': c}})
+        collection = {'type': 'FeatureCollection', 'features': features}
+        epsg = None
+        if self.crs is not None:
+            from pyproj import CRS  # pylint: disable=import-outside-toplevel
+            epsg = CRS.from_wkt(self.crs).to_epsg()
+        if epsg is not None:
+            collection['crs'] = {'type': 'name', 'properties':
+                                 {'name': f'urn:ogc:def:crs:EPSG::{epsg}'}}
+        with open(fn, 'w', encoding='utf-8') as f:
+            json.dump(collection, f)
 
 # ------------------------------------------------------------------------------
 
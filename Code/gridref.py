@@ -0,0 +1,120 @@
+'''
+About  : Vectorised conversion of British National Grid references to grid
+         squares (eastings/northings of south-west corner plus size).
+See    : https://en.wikipedia.org/wiki/Ordnance_Survey_National_Grid
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from typing import Final, Sequence
+
+import numpy as np
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+MAX_LEN: Final[int] = 12        # letters plus 10-figure reference
+TETRAD_SIZE: Final[int] = 2000  # side of tetrad (DINTY) square in metres
+
+# ------------------------------------------------------------------------------
+
+def _init_squares() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''Build lookup tables of 100km square offsets indexed by letter pairs.
+    Args:
+        N/A
+    Returns:
+        (tuple of arrays) - easting, northing, valid; each shape (26, 26)
+    '''
+    e100 = np.zeros((26, 26), dtype=np.int64)
+    n100 = np.zeros((26, 26), dtype=np.int64)
+    valid = np.zeros((26, 26), dtype=bool)
+    for i in range(26):
+        for j in range(26):
+            if i == 8 or j == 8:    # letter 'I' is not used
+                continue
+            l1 = i - 1 if i > 8 else i
+            l2 = j - 1 if j > 8 else j
+            e = ((l1 - 2) % 5) * 5 + l2 % 5
+            n = (19 - (l1 // 5) * 5) - l2 // 5
+            # Restrict to the squares which make up the grid
+            if 0 <= e < 7 and 0 <= n < 13:
+                e100[i, j] = e * 100000
+                n100[i, j] = n * 100000
+                valid[i, j] = True
+
+    return e100, n100, valid
+
+_E100, _N100, _VALID100 = _init_squares()
+
+# ------------------------------------------------------------------------------
+
+def decode(gridrefs: Sequence[str]|np.ndarray) -> tuple[np.ndarray, np.ndarray,
+                                                        np.ndarray, np.ndarray]:
+    '''Convert grid references to grid squares. Handles 2, 4, 6, 8 and 10-figure
+       references (10km to 1m squares) and tetrad (DINTY) references such as
+       'SJ45Q' (2km squares). Case and spaces are ignored.
+    Args:
+        gridrefs (sequence of strings) - grid references
+    Returns:
+        (tuple of arrays) - easting, northing (south-west corner), size of
+                            square (metres), valid (False if not a grid ref)
+    '''
+    count = len(gridrefs)
+    if count == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+    refs = np.char.upper(np.char.replace(np.asarray(gridrefs, dtype=str), ' ', ''))
+    lens = np.char.str_len(refs)
+    refs = refs.astype(f'<U{MAX_LEN + 1}')
+    codes = refs.view(np.uint32).reshape(count, MAX_LEN + 1).astype(np.int64)
+    alpha = (codes >= ord('A')) & (codes <= ord('Z'))
+    digits = codes - ord('0')
+    is_digit = (digits >= 0) & (digits <= 9)
+    # 100km square from letter pair
+    l1 = np.where(alpha[:, 0], codes[:, 0] - ord('A'), 0)
+    l2 = np.where(alpha[:, 1], codes[:, 1] - ord('A'), 0)
+    valid = (lens <= MAX_LEN) & alpha[:, 0] & alpha[:, 1] & _VALID100[l1, l2]
+    e = _E100[l1, l2]
+    n = _N100[l1, l2]
+    size = np.zeros(count, dtype=np.int64)
+    # Numeric references - half of the figures give each of easting/northing
+    pos = np.arange(MAX_LEN + 1)
+    in_figs = (pos >= 2)[np.newaxis, :] & (pos[np.newaxis, :] < lens[:, np.newaxis])
+    all_digits = ~(in_figs & ~is_digit).any(axis=1)
+    e_off = np.zeros(count, dtype=np.int64)
+    n_off = np.zeros(count, dtype=np.int64)
+    is_numeric = np.zeros(count, dtype=bool)
+    for half in range(1, 6):
+        ix = np.flatnonzero(valid & all_digits & (lens == 2 + 2 * half))
+        weights = 10 ** np.arange(half - 1, -1, -1)
+        scale = 10 ** (5 - half)
+        e_off[ix] = digits[ix, 2:2 + half] @ weights * scale
+        n_off[ix] = digits[ix, 2 + half:2 + 2 * half] @ weights * scale
+        size[ix] = scale
+        is_numeric[ix] = True
+    # Tetrad references - 10km square plus letter (excluding 'O') for 2km square
+    is_tetrad = (valid & (lens == 5) & is_digit[:, 2] & is_digit[:, 3] &
+                 alpha[:, 4] & (codes[:, 4] != ord('O')))
+    ix = np.flatnonzero(is_tetrad)
+    t = codes[ix, 4] - ord('A')
+    t = np.where(t > 14, t - 1, t)
+    e_off[ix] = digits[ix, 2] * 10000 + (t // 5) * TETRAD_SIZE
+    n_off[ix] = digits[ix, 3] * 10000 + (t % 5) * TETRAD_SIZE
+    size[ix] = TETRAD_SIZE
+
+    valid &= is_numeric | is_tetrad
+    e = np.where(valid, e + e_off, 0)
+    n = np.where(valid, n + n_off, 0)
+    size = np.where(valid, size, 0)
+
+    return e, n, size, valid
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
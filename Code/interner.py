@@ -0,0 +1,137 @@
+'''
+About  : Implements the Interner class which replaces repeated values of the
+         records read from a file with a single shared instance of each
+         distinct value (dictionary encoding), reducing memory use.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from typing import Final
+
+import numpy as np
+import pandas as pd
+
+import const
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+class Interner:
+    '''Class which keeps one instance of each distinct value of each column.
+       As values then share identities, dict lookups of them (e.g. by the rule
+       caches) match by identity rather than by comparing characters.'''
+
+    # Columns whose values are (almost) unique to each record
+    UNIQUE: Final[tuple[str, ...]] = (
+        const.I_KEY,
+        const.I_ID,
+        const.I_RECORDKEY,
+        const.I_EXTERNAL_KEY,
+        const.I_LATITUDE,
+        const.I_LONGITUDE,
+        const.I_ORIGINAL_MAP_REF,
+        const.I_INPUT_ON_DATE,
+        const.I_LAST_EDITED_ON_DATE)
+
+    LIMIT: Final[int] = 100000  # max. distinct values kept per column
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+        '''Constructor.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.count: int = 0     # number of records interned
+        self.tables: dict[str, dict[str, str]] = {
+            col: {} for col in const.I_COLUMNS if col not in self.UNIQUE}
+
+    # --------------------------------------------------------------------------
+
+    def intern(self, record: dict[str, str]) -> None:
+        '''Replace the values of a record with their shared instances.
+        Args:
+            record (dict) - record read from file
+        Returns:
+            N/A
+        '''
+        self.count += 1
+        for col, table in self.tables.items():
+            value = record.get(col)
+            if value is None:
+                continue
+            shared = table.get(value)
+            if shared is None:
+                if len(table) < self.LIMIT:
+                    table[value] = value
+            else:
+                record[col] = shared
+
+    # --------------------------------------------------------------------------
+
+    def intern_frame(self, df: pd.DataFrame) -> list[list[str]]:
+        '''Return the values of each column of a frame of records, replaced by
+           their shared instances. Each distinct value of a column is looked up
+           once.
+        Args:
+            df (DataFrame) - records (columns of strings)
+        Returns:
+            (list of lists of strings) - values of each column
+        '''
+        self.count += len(df)
+        rv: list[list[str]] = []
+        for col in df.columns:
+            values = df[col].to_numpy()
+            table = self.tables.get(col)
+            if table is not None:
+                codes, uniques = pd.factorize(values, use_na_sentinel=False)
+                shared = np.empty(len(uniques), dtype=object)
+                for i, value in enumerate(uniques):
+                    shared[i] = table.get(value)
+                    if shared[i] is None:
+                        shared[i] = value
+                        if len(table) < self.LIMIT:
+                            table[value] = value
+                values = shared[codes]
+            rv.append(values.tolist())
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def log_stats(self) -> None:
+        '''Write the number of distinct values to log.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        distinct = sum(len(table) for table in self.tables.values())
+        log.debug('Interned %s values of %s records: %s distinct values',
+                  f'{self.count * len(self.tables):,}', f'{self.count:,}',
+                  f'{distinct:,}')
+
+    # --------------------------------------------------------------------------
+
+    def reset(self) -> None:
+        '''Forget the values of the previous file.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.count = 0
+        for table in self.tables.values():
+            table.clear()
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -32,6 +32,8 @@ def main() -> None:
     '''
     parser = argparse.ArgumentParser(description='iRecord Parser')
     parser.add_argument('-i', '--ini', required=True, help='INI file path')
+    parser.add_argument('-c', '--compile', action='store_true',
+                        help='compile the GIS region file and exit')
     args = parser.parse_args()
     fn_config = args.ini
 
@@ -39,7 +41,10 @@ def main() -> None:
     log.info('='*50)
     try:
         rc = RecordController(fn_config)
-        rc.process()
+        if args.compile:
+            rc.compile_region()
+        else:
+            rc.process()
     except Exception as ex: # pylint: disable=broad-exception-caught
         log.error(ex)
         traceback.print_exception(*sys.exc_info())
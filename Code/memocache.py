@@ -0,0 +1,96 @@
+'''
+About  : Implements the MemoCache class which remembers the results of a
+         function for its most recently used arguments.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+class MemoCache:
+    '''Class which wraps a function of hashable arguments with a bounded (LRU)
+       cache of its results.'''
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, name: str, func: Callable[..., Any], size: int) -> None:
+        '''Constructor.
+        Args:
+            name (string) - name of cache (for logging)
+            func (Callable) - function to be cached (must have no side effects)
+            size (int) - max. number of results cached (0 = no caching)
+        Returns:
+            N/A
+        '''
+        self.name: str = name
+        self.func: Callable[..., Any] = func
+        self.size: int = size
+        self.cache: OrderedDict[tuple, Any] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    # --------------------------------------------------------------------------
+
+    def __call__(self, *args: Any) -> Any:
+        '''Return the result of the function for the given arguments.'''
+        try:
+            rv = self.cache[args]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self.cache.move_to_end(args)
+            return rv
+
+        self.misses += 1
+        rv = self.func(*args)
+        if self.size > 0:
+            self.cache[args] = rv
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def clear(self) -> None:
+        '''Empty the cache and reset the statistics.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    # --------------------------------------------------------------------------
+
+    def log_stats(self) -> None:
+        '''Write cache statistics to log.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups > 0 else 0
+        log.debug('%s cache hits: %s, misses: %s, evictions: %s (%s hit rate)',
+                  self.name, f'{self.hits:,}', f'{self.misses:,}',
+                  f'{self.evictions:,}', f'{rate:.1f}%')
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
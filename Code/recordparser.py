@@ -8,19 +8,31 @@ About  : Implements the RecordParser class which performs the data input,
 import csv
 import logging
 import os
+import re
 import threading
 import time
-from typing import Any
+from collections.abc import Iterator
+from contextlib import ExitStack
+from itertools import repeat
+from typing import Any, Final, TextIO
 
+import numpy as np
 import pandas as pd
 from progress import spinner
 from progress.bar import Bar
+from progress.counter import Counter
 
 import const
 import utils
 from configmgr import ConfigMgr
 from crosscheck import Crosschecker
-from rules import DupeDict, Records, Rules
+from dupeindex import DupeIndex
+from dupestore import DupeStore
+from interner import Interner
+from rules import DupeDict, Record, Records, Rules
+from skipengine import SkipEngine, SkipMask
+from swiftbuilder import SwiftBuilder
+from swiftrow import SwiftRows
 
 # ------------------------------------------------------------------------------
 
@@ -31,6 +43,8 @@ log: logging.Logger = logging.getLogger(__name__)
 class RecordParser:
     '''Class which orchestrates the data input, parsing and output processes.'''
 
+    CSV_CHUNK: Final[int] = 20000   # rows parsed at a time by pandas C engine
+
     # --------------------------------------------------------------------------
 
     def __init__(self, config: ConfigMgr) -> None:
@@ -42,32 +56,52 @@ class RecordParser:
         '''
         self.config: ConfigMgr = config   # instance of ConfigMgr class
         self.crosscheck: Crosschecker = Crosschecker(self.config)
+        # Records of earlier files, for de-duping across files
+        self.dupestore: DupeStore|None = (DupeStore(config.dupe_store)
+            if len(config.dupe_store) > 0 else None)
+        # Shared instances of repeated values
+        self.interner: Interner|None = Interner() if config.intern_values else None
+        self.rules: Rules = Rules(self.crosscheck)  # reused for every record
+        self.dupechecks: DupeDict = {}    # Records of file, for de-duping
+        self.engine: SkipEngine = SkipEngine(self.crosscheck)  # columnar skip tests
+        # Results of the cheap skip tests of the records being processed
+        self.cheap: list[tuple[str, SkipMask]]|None = None
         self.filename: str = ''           # input filename
+        self.output_name: str = ''        # name after which outputs are named
+        # Input file whose outputs were given each name, to avoid overwriting
+        self.output_names: dict[str, str] = {}
         self.key_processed: Records = []  # Previously processed records
-        self.key_new: Records = []        # New records
+        self.key_new: list[str] = []      # RecordKeys of new records
+        # Output CSV files being written, and their writers
+        self.outputs: dict[str, tuple[TextIO, csv.DictWriter]] = {}
+        self.exits: ExitStack = ExitStack()  # closes output CSV files
         self.records: Records = []        # Records read from file
-        self.skipped: Records = []        # Records skipped in Swift format
-        self.swift: Records = []          # Records to be exported in Swift format
+        # Number of Swift/skipped records within each named region
+        self.region_totals: dict[str, list[int]] = {}
+        # Swift/skipped records within each named region (multi-region mode)
+        self.routed: dict[str, tuple[SwiftRows, SwiftRows]] = {}
+        self.skipped: SwiftRows = []      # Records skipped in Swift format
+        self.swift: SwiftRows = []        # Records to be exported in Swift format
+        # Number of records read, skipped, exported and previously processed
+        self.totals: dict[str, int] = {}
 
     # --------------------------------------------------------------------------
 
-    def check_columns(self) -> bool:
-        '''Check that the input file has the correct columns.
+    def check_header(self, columns: list[str]) -> bool:
+        '''Check that the columns of the input file are those expected.
         Args: 
-            N/A
+            columns (list of strings) - column names of file
         Returns:
             (bool) - True if all required columns are present, else False
         '''
         rv: bool = True
-        extra = [col for col in self.records[0] if col not in const.I_COLUMNS]
+        extra = [col for col in columns if col not in const.I_COLUMNS]
         if len(extra) > 0:
             log.warning('Input file has unused columns: %s', extra)
-            # Remove the unused keys from each dictionary
-            for col in extra:
-                for record in self.records:
-                    record.pop(col, None)
 
-        missing = [col for col in const.I_COLUMNS if col not in self.records[0]]
+        # Key is not read from file, but numbers the records as they are read
+        missing = [col for col in const.I_COLUMNS
+                   if col not in columns and col != const.I_KEY]
         if len(missing) > 0:
             log.error('Input file does not contain all required columns: %s', missing)
             rv = False
@@ -76,6 +110,115 @@ class RecordParser:
 
     # --------------------------------------------------------------------------
 
+    def close(self) -> None:
+        '''Release the resources held between files (e.g. duplicate store). They
+           are acquired again if further files are read.
+        Args: 
+            N/A
+        Returns: 
+            N/A 
+        '''
+        if self.dupestore is not None:
+            self.dupestore.close()
+            self.dupestore = None
+
+    # --------------------------------------------------------------------------
+
+    def close_outputs(self) -> None:
+        '''Close the output CSV files.
+        Args: 
+            N/A
+        Returns: 
+            N/A 
+        '''
+        self.exits.close()
+        self.outputs.clear()
+
+    # --------------------------------------------------------------------------
+
+    def end_processing(self) -> None:
+        '''Report the results of processing the records of a file.
+        Args: 
+            N/A
+        Returns: 
+            N/A 
+        '''
+        georegion = self.crosscheck.georegion
+        rules = self.rules
+        totals = self.totals
+        log.info('Number of iRecord records: %s', f'{totals["records"]:,}')
+        log.info('Number of skipped records: %s', f'{totals["skipped"]:,}')
+        log.info('Number of Swift records: %s', f'{totals["swift"]:,}')
+        log.info('Number of previously processed records: %s', f'{totals["processed"]:,}')
+        for index in (self.dupechecks, self.engine.first):
+            if isinstance(index, DupeIndex) and len(index) > 0:
+                index.log_stats()
+        for name, (swift, skipped) in sorted(self.region_totals.items()):
+            log.info('Region %s: %s Swift records, %s skipped records', name,
+                     f'{swift:,}', f'{skipped:,}')
+        georegion.plot(self.output_name)
+        _, outside = georegion.count()
+        log.info('Number of gridrefs outside region: %s', f'{outside:,}')
+        georegion.log_cache_stats()
+        rules.log_cache_stats()
+        rules.counts.log_stats()
+        georegion.save_verdicts()
+        if self.dupestore is not None:
+            self.dupestore.flush()
+
+    # --------------------------------------------------------------------------
+
+    def init_processing(self) -> None:
+        '''Prepare to process the records of a file.
+        Args: 
+            N/A
+        Returns: 
+            N/A 
+        '''
+        log.info('Processing records')
+        self.totals = dict.fromkeys(('records', 'skipped', 'swift', 'processed'), 0)
+        self.region_totals.clear()
+        # Maintain a set of created records for de-duping
+        self.dupechecks = DupeIndex() if self.config.dupe_hash else dict()
+        if self.dupestore is None and len(self.config.dupe_store) > 0:
+            # Re-open the store if closed after an earlier run
+            self.dupestore = DupeStore(self.config.dupe_store)
+        if self.dupestore is not None:
+            self.dupestore.set_file(self.filename)
+            self.dupechecks = self.dupestore
+        self.engine = SkipEngine(self.crosscheck, self.dupestore)
+
+    # --------------------------------------------------------------------------
+
+    def load_region(self, records: Records) -> None:
+        '''Classify the gridrefs of records in bulk (see GeoRegion.load_table).
+        Args: 
+            records (Records) - iRecord records
+        Returns: 
+            N/A
+        '''
+        rejected = None
+        self.cheap = None
+        if self.config.fast_reject != const.FAST_REJECT_OFF:
+            # Records which will be skipped anyway need no region test. The
+            # results are reused by the columnar skip tests of the records.
+            self.cheap = self.engine.skip_cheap(self.engine.get_frame(records))
+            rejected = np.logical_or.reduce([m for _, (m, _) in self.cheap])
+        coords = None
+        if self.config.region_points is True:
+            coords = tuple([rec[col] for rec in records]
+                           for col in (const.I_LATITUDE, const.I_LONGITUDE,
+                                       const.I_PRECISION))
+        vcs = None
+        if len(self.config.region_vcs) > 0:
+            vcs = tuple([rec[col] for rec in records]
+                        for col in (const.I_VC_NUMBER, const.I_PRECISION))
+        self.crosscheck.georegion.load_table(
+            [rec[const.I_OUTPUT_MAP_REF] for rec in records],
+            coords, vcs, rejected) # type: ignore
+
+    # --------------------------------------------------------------------------
+
     def output_excel(self):
         '''Output results to multitab Excel workbook.
         Args: 
@@ -87,7 +230,7 @@ class RecordParser:
         '''
         # ----------------------------------------------------------------------
         #
-        def add_sheet(writer: pd.ExcelWriter, name: str, data: Records,
+        def add_sheet(writer: pd.ExcelWriter, name: str, data: Records|SwiftRows,
                       cols: list[str], formatxls: Any, freeze_col: int) -> None:
             '''Add new sheet to workbook, populate and format as required.
             Args: 
@@ -121,8 +264,7 @@ class RecordParser:
                 sheet.write(0, col_num, value, formatxls)
         # ----------------------------------------------------------------------
         # Get filename
-        fb = os.path.basename(self.filename)
-        fb = os.path.splitext(fb)[0]
+        fb = os.path.splitext(self.output_name)[0]
         fn = os.path.join(self.config.dir_data_out, fb + '.xlsx')
         log.info('Writing Excel file: %s', fn)
         with pd.ExcelWriter(fn, engine='xlsxwriter') as writer:
@@ -151,27 +293,9 @@ class RecordParser:
         Returns: 
             N/A 
         '''
-        # ----------------------------------------------------------------------
-        # Write a single CSV file
-        def write_file(fn_txt: str, data: Records, fields: list[str]):
-            fb = os.path.basename(self.filename)
-            fn = os.path.join(self.config.dir_data_out,
-                              utils.append_filename(fb, fn_txt))
-            log.info('Writing %s file: %s', fn_txt, fn)
-            with open(fn, 'w', encoding='utf-8') as out_file:
-                writer = csv.DictWriter(out_file, lineterminator='\r',
-                                        quoting=csv.QUOTE_NONNUMERIC,
-                                        fieldnames=fields,
-                                        extrasaction='ignore')
-                writer.writeheader()
-                writer.writerows(data)
-        # ----------------------------------------------------------------------
-
         log.info('Writing results to CSV files')
-        write_file('_key', self.records, const.I_COLUMNS)
-        write_file('_skip', self.skipped, const.S_COLUMNS)
-        write_file('_swift', self.swift, const.S_COLUMNS)
-        write_file('_processed', self.key_processed, [const.I_RECORDKEY])
+        self.write_results(self.records)
+        self.close_outputs()
         # Update the processed records file
         self.update_processed()
         # Only produce Excel workbook if config flag set
@@ -184,6 +308,88 @@ class RecordParser:
                     spin.next()
                     time.sleep(0.1)
             thread.join()
+
+    # --------------------------------------------------------------------------
+
+    def parse_csv(self, f: TextIO, columns: list[str], usecols: list[str]) -> Iterator[Record]:
+        '''Parse the rows of a CSV file with the pandas C engine, keeping only
+           the given columns. Values are kept as strings, as by csv.DictReader.
+        Args: 
+            f (TextIO) - CSV file, positioned after its header
+            columns (list of strings) - column names of file
+            usecols (list of strings) - columns to be kept
+        Returns: 
+            (Iterator of Record) - records
+        '''
+        for df in pd.read_csv(f, header=None, names=columns, usecols=usecols,
+                              dtype=object, na_filter=False, engine='c',
+                              chunksize=self.CSV_CHUNK):
+            if self.interner is not None:
+                values = self.interner.intern_frame(df)
+            else:
+                values = [df[col].tolist() for col in df.columns]
+            yield from map(dict, map(zip, repeat(list(df.columns)), zip(*values)))
+
+    # --------------------------------------------------------------------------
+
+    def process_chunk(self, records: Records, progbar: Bar|Counter) -> None:
+        '''Process a chunk of the iRecord records of a file (all of the records
+           unless streaming).
+        Args: 
+            records (Records) - iRecord records
+            progbar (Bar|Counter) - progress indicator
+        Returns: 
+            N/A 
+        '''
+        georegion = self.crosscheck.georegion
+        rules = self.rules
+        totals = self.totals
+        columnar = self.config.columnar_skip
+        results: list[SwiftRows] = []
+        if self.config.columnar_swift is True:
+            # Create the Swift records of the whole chunk at once
+            results = SwiftBuilder(rules).build(records)
+        elif columnar is True:
+            for rec in records:
+                rules.set_record(rec)
+                results.append(rules.get_swift())
+        if columnar is True:
+            # Apply skip tests to the whole chunk at once
+            itypes, inotes = self.engine.is_skip(records, results, self.cheap)
+        self.cheap = None
+        for ix, rec in enumerate(records):
+            progbar.next()
+            rules.set_record(rec)
+            res = results[ix] if len(results) > 0 else rules.get_swift()
+            # Determine whether record should be skipped
+            if columnar is True:
+                itype, inote = itypes[ix], inotes[ix]
+            else:
+                itype, inote = rules.is_skip(res, self.dupechecks)
+            if len(itype) > 0:
+                # Handle cloned results
+                for r in res:
+                    r[const.S_IMPORTTYPE] = itype
+                    r[const.S_IMPORTNOTE] = inote
+                self.skipped += res
+                totals['skipped'] += len(res)
+            else:
+                self.swift += res
+                totals['swift'] += len(res)
+            # Route to the named regions within which the record falls
+            if georegion.named_tree is not None:
+                for name in georegion.gridref_regions(rec[const.I_OUTPUT_MAP_REF]):
+                    swift, skipped = self.routed.setdefault(name, ([], []))
+                    (skipped if len(itype) > 0 else swift).extend(res)
+                    self.region_totals.setdefault(name, [0, 0])[len(itype) > 0] += len(res)
+            # Determine whether the record has been previously processed
+            if self.crosscheck.is_processed(rec[const.I_RECORDKEY]):
+                self.key_processed.append(rec)
+                totals['processed'] += 1
+            else:
+                self.key_new.append(rec[const.I_RECORDKEY])
+        totals['records'] += len(records)
+
     # --------------------------------------------------------------------------
 
     def process_records(self) -> None:
@@ -193,36 +399,10 @@ class RecordParser:
         Returns: 
             N/A 
         '''
-        log.info('Processing records')
-        # Maintain a set of created records for de-duping
-        dupechecks: DupeDict = dict()
+        self.init_processing()
         with Bar('Processing records...', max=len(self.records)) as progbar:
-            for rec in self.records:
-                progbar.next()
-                rules = Rules(rec, self.crosscheck)
-                res = rules.get_swift()
-                # Determine whether record should be skipped
-                itype, inote = rules.is_skip(res, dupechecks)
-                if len(itype) > 0:
-                    # Handle cloned results
-                    for r in res:
-                        r[const.S_IMPORTTYPE] = itype
-                        r[const.S_IMPORTNOTE] = inote
-                    self.skipped += res
-                else:
-                    self.swift += res
-                # Determine whether the record has been previously processed
-                if self.crosscheck.is_processed(rec[const.I_RECORDKEY]):
-                    self.key_processed.append(rec)
-                else:
-                    self.key_new.append(rec)
-        log.info('Number of iRecord records: %s', f'{len(self.records):,}')
-        log.info('Number of skipped records: %s', f'{len(self.skipped):,}')
-        log.info('Number of Swift records: %s', f'{len(self.swift):,}')
-        log.info('Number of previously processed records: %s', f'{len(self.key_processed):,}')
-        self.crosscheck.georegion.plot(self.filename)
-        _, outside = self.crosscheck.georegion.count()
-        log.info('Number of gridrefs outside region: %s', f'{outside:,}')
+            self.process_chunk(self.records, progbar)
+        self.end_processing()
         self.output_results()
 
     # --------------------------------------------------------------------------
@@ -230,35 +410,120 @@ class RecordParser:
     def read_file(self, fn: str) -> bool:
         '''Read the contents of a given CSV file.
         Args: 
-            fn (string) - CSV filename
+            fn (string) - CSV filename (see utils.open_input)
         Returns: 
             (bool) - True if successful, else False
         '''
         log.info('Reading file: %s', fn)
-        # Initialise
-        self.filename = fn
+        # Initialise (output files are named after the uncompressed file)
+        name = utils.output_name(fn)
+        if self.output_names.setdefault(name, fn) != fn:
+            log.error('Output files of %s would overwrite those of %s - file '
+                      'skipped', fn, self.output_names[name])
+            return False
+        self.filename = utils.strip_compression(fn)
+        self.output_name = name
         self.key_new.clear()
         self.key_processed.clear()
         self.records.clear()
+        self.routed.clear()
         self.skipped.clear()
         self.swift.clear()
         rv: bool = True
         self.crosscheck.georegion.reset()
-        self.records.clear()
-        # Read file
-        with open(fn, mode='r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for ix, dct in enumerate(reader):
-                dct[const.I_KEY] = ix + 1
-                self.records.append(dct)
-
-        # Check that the input file has the correct columns
-        rv = self.check_columns()
-        if rv is True:
+        try:
+            # Read file
+            with utils.open_input(fn) as f:
+                reader = csv.DictReader(f)
+                # Check that the input file has the correct columns
+                rv = self.check_header(list(reader.fieldnames or []))
+                if rv is False:
+                    return rv
+                records = self.read_records(f, reader, self.config.stream_chunk)
+                if self.config.stream_chunk > 0:
+                    self.stream_records(records)
+                    return rv
+                for chunk in records:
+                    self.records += chunk
+
             log.debug('Number of records read from file: %i', len(self.records))
+            self.load_region(self.records)
             self.process_records()
+        finally:
+            # Output files are closed even if processing fails
+            self.close_outputs()
 
         return rv
+
+    # --------------------------------------------------------------------------
+
+    def read_records(self, f: TextIO, reader: csv.DictReader,
+                     size: int) -> Iterator[Records]:
+        '''Read the records of a CSV file in chunks, numbering each record. Only
+           the expected columns of each record are kept.
+        Args: 
+            f (TextIO) - CSV file
+            reader (DictReader) - reader of CSV file, having read its header
+            size (int) - records per chunk (0 = all records in one chunk)
+        Returns: 
+            (Iterator of Records) - chunks of records
+        '''
+        columns = list(reader.fieldnames or [])
+        extra = [col for col in columns if col not in const.I_COLUMNS]
+        rows: Iterator[Record] = reader
+        interner = self.interner
+        if self.config.csv_engine == const.CSV_ENGINE_C:
+            rows = self.parse_csv(f, columns,
+                                  [col for col in columns if col in const.I_COLUMNS])
+            extra = []
+            interner = None     # values are interned as they are parsed
+        chunk: Records = []
+        for ix, dct in enumerate(rows):
+            # Remove the unused keys from each dictionary
+            for col in extra:
+                dct.pop(col, None)
+            dct[const.I_KEY] = ix + 1
+            if interner is not None:
+                interner.intern(dct)
+            chunk.append(dct)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+        if self.interner is not None:
+            self.interner.log_stats()
+            self.interner.reset()
+
+    # --------------------------------------------------------------------------
+
+    def stream_records(self, records: Iterator[Records]) -> None:
+        '''Process and write the records of a CSV file a chunk at a time, so that
+           memory use depends upon the chunk size, not the file size.
+        Args: 
+            records (Iterator of Records) - chunks of records
+        Returns: 
+            N/A
+        '''
+        self.init_processing()
+        with Counter('Processing records... ') as progbar:
+            for chunk in records:
+                self.load_region(chunk)
+                self.process_chunk(chunk, progbar)
+                # Write the results of the chunk, then forget them
+                self.write_results(chunk)
+                self.key_processed.clear()
+                self.routed.clear()
+                self.skipped.clear()
+                self.swift.clear()
+        self.end_processing()
+        # Ensure that the files are written even if there are no records
+        self.write_results([])
+        self.close_outputs()
+        self.update_processed()
+        if self.config.excel is True:
+            log.warning('Excel file is not written when streaming records')
+
     # --------------------------------------------------------------------------
 
     def update_processed(self):
@@ -275,11 +540,52 @@ class RecordParser:
         log.info('Updating processed file: %s', fn)
         df = utils.read_csv_robust(fn)
         # Extract RecordKey from each object
-        record_keys = [obj[const.I_RECORDKEY] for obj in self.key_new]
-        new_df = pd.DataFrame(record_keys, columns=[df.columns[0]])
+        new_df = pd.DataFrame(self.key_new, columns=[df.columns[0]])
         df = pd.concat([df, new_df], ignore_index=True).drop_duplicates()
         df.to_csv(fn, index=False, encoding='utf-8-sig')
 
+    # --------------------------------------------------------------------------
+
+    def write_results(self, records: Records) -> None:
+        '''Append records and their results to the output CSV files.
+        Args: 
+            records (Records) - iRecord records
+        Returns: 
+            N/A
+        '''
+        self.write_rows('_key', records, const.I_COLUMNS)
+        self.write_rows('_skip', self.skipped, const.S_COLUMNS)
+        self.write_rows('_swift', self.swift, const.S_COLUMNS)
+        self.write_rows('_processed', self.key_processed, [const.I_RECORDKEY])
+        for name, (swift, skipped) in sorted(self.routed.items()):
+            tag = '_' + re.sub(r'[^\w-]+', '_', name)
+            self.write_rows(tag + '_skip', skipped, const.S_COLUMNS)
+            self.write_rows(tag + '_swift', swift, const.S_COLUMNS)
+
+    # --------------------------------------------------------------------------
+
+    def write_rows(self, fn_txt: str, data: Records|SwiftRows, fields: list[str]) -> None:
+        '''Append rows to an output CSV file, creating it if not yet written.
+        Args: 
+            fn_txt (string) - suffix of filename
+            data (Records|SwiftRows) - rows to be written
+            fields (list of strings) - column names
+        Returns: 
+            N/A
+        '''
+        if fn_txt not in self.outputs:
+            fn = os.path.join(self.config.dir_data_out,
+                              utils.append_filename(self.output_name, fn_txt))
+            log.info('Writing %s file: %s', fn_txt, fn)
+            out_file = self.exits.enter_context(open(fn, 'w', encoding='utf-8'))
+            writer = csv.DictWriter(out_file, lineterminator='\r',
+                                    quoting=csv.QUOTE_NONNUMERIC,
+                                    fieldnames=fields,
+                                    extrasaction='ignore')
+            writer.writeheader()
+            self.outputs[fn_txt] = (out_file, writer)
+        self.outputs[fn_txt][1].writerows(data)
+
 # ------------------------------------------------------------------------------
 
 '''
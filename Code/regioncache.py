@@ -0,0 +1,112 @@
+'''
+About  : Functions which cache the parsed GIS region geometry alongside its
+         shapefile, so that later runs need not read the shapefile. The cache is
+         keyed by a fingerprint of the shapefile and rebuilt when it changes.
+'''
+
+# ------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import os
+from typing import Final
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+# Shapefile component file extensions covered by the fingerprint
+EXTENSIONS: Final[tuple[str, ...]] = ('.shp', '.shx', '.dbf', '.prj')
+
+# Filename suffix of the geometry cache file (stored next to the shapefile)
+SUFFIX: Final[str] = '.geom.npz'
+
+# ------------------------------------------------------------------------------
+
+def fingerprint(fn_gis: str) -> str:
+    '''Return a fingerprint of a shapefile, covering the modification time, size
+       and contents of each of its component files.
+    Args:
+        fn_gis (string) - path to GIS shapefile
+    Returns:
+        (string) - hex digest
+    '''
+    h = hashlib.sha256()
+    stem = os.path.splitext(fn_gis)[0]
+    for ext in EXTENSIONS:
+        fn = stem + ext
+        if not os.path.isfile(fn):
+            continue
+        st = os.stat(fn)
+        h.update(f'{ext}:{st.st_size}:{st.st_mtime_ns}:'.encode())
+        with open(fn, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+
+    return h.hexdigest()
+
+# ------------------------------------------------------------------------------
+
+def get_filename(fn_gis: str) -> str:
+    '''Return the geometry cache filename associated with a GIS shapefile.
+    Args:
+        fn_gis (string) - path to GIS shapefile
+    Returns:
+        (string) - path to geometry cache file
+    '''
+    return os.path.splitext(fn_gis)[0] + SUFFIX
+
+# ------------------------------------------------------------------------------
+
+def load(fn_gis: str, key: str) -> tuple[BaseGeometry, str]|None:
+    '''Load the cached region geometry for a shapefile, if still current.
+    Args:
+        fn_gis (string) - path to GIS shapefile
+        key (string) - current fingerprint of shapefile
+    Returns:
+        (tuple/None) - (region geometry, WKT of CRS), else None if no cache file
+                       or the shapefile has changed since it was written
+    '''
+    fn = get_filename(fn_gis)
+    if not os.path.isfile(fn):
+        return None
+    with np.load(fn) as data:
+        if str(data['fingerprint']) != key:
+            log.info('GIS file has changed - rebuilding geometry cache: %s', fn)
+            return None
+        log.debug('Loading geometry cache file: %s', fn)
+        region = shapely.from_wkb(data['wkb'].tobytes())
+        crs = str(data['crs'])
+
+    return region, crs
+
+# ------------------------------------------------------------------------------
+
+def save(fn_gis: str, key: str, region: BaseGeometry, crs: str) -> None:
+    '''Save the region geometry for a shapefile to its cache file.
+    Args:
+        fn_gis (string) - path to GIS shapefile
+        key (string) - fingerprint of shapefile
+        region (BaseGeometry) - unioned region geometry
+        crs (string) - WKT representation of region CRS
+    Returns:
+        N/A (the cache is not written if the folder is read-only)
+    '''
+    fn = get_filename(fn_gis)
+    log.debug('Writing geometry cache file: %s', fn)
+    try:
+        np.savez(fn, fingerprint=np.array(key), crs=np.array(crs),
+                 wkb=np.frombuffer(shapely.to_wkb(region), dtype=np.uint8))
+    except OSError as ex:
+        log.warning('Could not write geometry cache file (%s): %s', ex, fn)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -6,13 +6,17 @@ About  : Implements the Rules class which contains the logic to transform
 # ------------------------------------------------------------------------------
 
 import logging
-import re
 from typing import Final, TypeAlias
 from datetime import datetime
 
 import const
 import utils
+from countparser import CountParser
+from dupeindex import DupeIndex
+from dupestore import DupeStore
+from memocache import MemoCache
 from crosscheck import Crosschecker
+from swiftrow import SwiftRow, SwiftRows
 
 # ------------------------------------------------------------------------------
 
@@ -25,32 +29,95 @@ Records: TypeAlias = list[Record]
 
 # Types for de-duping. Use this approach for performance reasons.
 DupeTuple: TypeAlias = tuple[str, str, str, str, str, str, str, str, str]
-DupeDict: TypeAlias = dict[DupeTuple, str]
+DupeDict: TypeAlias = dict[DupeTuple, str]|DupeIndex|DupeStore
 
 # ------------------------------------------------------------------------------
 
 class Rules:
-    '''Class which performs the transformation of iRecord data into Swift format.'''
+    '''Class which performs the transformation of iRecord data into Swift format.
+       A single instance is reused for each record in turn (see set_record).'''
     NO_RECORD: Final[str] = 'not recorded'  # iRecord standard text
 
     # --------------------------------------------------------------------------
 
-    def __init__(self, record: Record, crosscheck: Crosschecker) -> None:
+    def __init__(self, crosscheck: Crosschecker) -> None:
         '''Constructor.
         Args: 
-            record (Record) = iRecord record to be assessed
             crosscheck (CrossChecker) - instance of object used for lookups
         Returns: 
             N/A
         '''
         self.crosscheck = crosscheck
-        self.record = record.copy()
+        # Results of rules for recently seen inputs (rules have no side effects)
+        size = crosscheck.config.rule_cache_size
+        # Parse results of recently seen 'Count of sex or stage' values
+        self.counts: CountParser = CountParser(size)
+        self.memo_identity = MemoCache('Identity', self.format_identity, size)
+        self.memo_licence = MemoCache('Licence', self.skip_licence, size)
+        self.memo_rank = MemoCache('Rank', self.skip_rank, size)
+        self.memo_verification = MemoCache('Verification', self.skip_verification,
+                                           size)
+        # iRecord record being assessed (read only - not copied)
+        self.record: Record = {}
         # Returned processed records in list format as one record may be cloned
-        self.swift: Records = []
+        self.swift: SwiftRows = []
 
     # --------------------------------------------------------------------------
 
-    def get_swift(self) -> Records:
+    def format_identity(self, name: str, source: str) -> str:
+        '''Return the supplied name in a Swift-compatible format (see get_identity).
+        Args: 
+            name (string) - iRecord recorder/determiner name
+            source (string) - iRecord source of record
+        Returns: 
+            (string) - formatted name
+        '''
+        if len(name) == 0:
+            return name
+
+        # Use only first name if more than one supplied
+        p = name.split(';')
+        n = name if len(p) == 1 else p[0]
+        # Do we have 'surname, forename'?
+        p = n.split(',')
+        if len(p) > 1:
+            rv = ' '.join(reversed(p))
+        else:
+            # Do we have 'forename surname'?
+            p = n.split(' ')
+            if len(p) > 1:
+                rv = n
+            else:
+                # Assume we have a username - ok to use real identity?
+                rv = self.crosscheck.get_user_identity(name)
+                if len(rv) == 0:
+                    # Permission for identity not granted
+                    s_l = source.lower()
+                    if 'irecord' in s_l:
+                        rv = 'Anon at iRecord'
+                    elif 'inaturalist' in s_l:
+                        rv = 'Anon at iNaturalist'
+                    else:
+                        rv = name
+                        log.debug('Unknown source: %s', s_l)
+
+        return rv.strip()
+
+    # --------------------------------------------------------------------------
+
+    def get_identity(self, name: str, source: str) -> str:
+        '''Return the supplied name in a Swift-compatible format.
+        Args: 
+            name (string) - iRecord recorder/determiner name
+            source (string) - iRecord source of record
+        Returns: 
+            (string) - formatted name
+        '''
+        return self.memo_identity(name, source)
+
+    # --------------------------------------------------------------------------
+
+    def get_swift(self) -> SwiftRows:
         '''Populate the 'swift' export list.
         Args: 
             N/A
@@ -66,6 +133,20 @@ class Rules:
 
     # --------------------------------------------------------------------------
 
+    def get_swift_clones(self, row: SwiftRow) -> SwiftRows:
+        '''Complete a Swift record built for the current record by SwiftBuilder,
+           by processing the sex/stage data (which may clone the record).
+        Args: 
+            row (SwiftRow) - Swift record
+        Returns: 
+            (list) - 'swift' list
+        '''
+        self.swift = [row]
+        self.get_swift_sexstage()
+        return self.swift
+
+    # --------------------------------------------------------------------------
+
     def get_swift_comment(self) -> None:
         '''Process the comment data. Generate comment from multiple fields.
         Args: 
@@ -116,44 +197,11 @@ class Rules:
         Returns: 
             N/A
         '''
-        # ----------------------------------------------------------------------
-        # Return the supplied name in a Swift-compatible format
-        def formatstr(name: str) -> str:
-            if len(name) == 0:
-                return name
-
-            # Use only first name if more than one supplied
-            p = name.split(';')
-            n = name if len(p) == 1 else p[0]
-            # Do we have 'surname, forename'?
-            p = n.split(',')
-            if len(p) > 1:
-                rv = ' '.join(reversed(p))
-            else:
-                # Do we have 'forename surname'?
-                p = n.split(' ')
-                if len(p) > 1:
-                    rv = n
-                else:
-                    # Assume we have a username - ok to use real identity?
-                    rv = self.crosscheck.get_user_identity(name)
-                    if len(rv) == 0:
-                        # Permission for identity not granted
-                        s_l = self.record[const.I_SOURCE].lower()
-                        if 'irecord' in s_l:
-                            rv = 'Anon at iRecord'
-                        elif 'inaturalist' in s_l:
-                            rv = 'Anon at iNaturalist'
-                        else:
-                            rv = name
-                            log.debug('Unknown source: %s', s_l)
-
-            return rv.strip()
-        # ----------------------------------------------------------------------
         # Process the identities contained within iRecord.
-        rec = formatstr(self.record[const.I_RECORDER])
-        det = formatstr(self.record[const.I_DETERMINER])
-        # ver = formatstr(self.record[const.I_VERIFIER])
+        source = self.record[const.I_SOURCE]
+        rec = self.get_identity(self.record[const.I_RECORDER], source)
+        det = self.get_identity(self.record[const.I_DETERMINER], source)
+        # ver = self.get_identity(self.record[const.I_VERIFIER], source)
 
         self.swift[0][const.S_OBSERVER] = rec
         self.swift[0][const.S_DETERMINER] = det
@@ -201,73 +249,43 @@ class Rules:
         if match is True:
             s[const.S_ABUNDANCE] = abund
 
-        c = p[const.I_COUNT_OF_SEX_OR_STAGE].strip()
-        n = utils.word_to_num(c)
-        if n is not None:
-            c = str(n)
-        # If count is a number or number range, then return
-        if len(c) == 0 or c.replace('-', '').isdigit():
-            return
-
-        # Extract abundance
-        pattern = r">?c?\d[0-9\-+/,'s ]*"
-        num = re.findall(pattern, c)
-        # Extract sex/stage terms
-        trm = re.split(pattern, c)
-        if all(len(t) == 0 for t in trm):
-            return
-        if len(num) != len(trm)-1:
+        # Pairs of abundance and sex/stage terms (None if count is a number)
+        c, terms, error = self.counts.parse(p[const.I_COUNT_OF_SEX_OR_STAGE])
+        if error is True:
             log.error('"%s" parse error: %s', const.I_COUNT_OF_SEX_OR_STAGE, c)
             return
-        # Prepare for cloning of records
-        p_c = self.record
-        s_c = self.swift[0]
+        if terms is None:
+            return
         # If 'mixed' & not already flagged for cloning then record will be cloned
-        mixed_clone = p_c[const.I_SEX].lower() == 'mixed' and len(num) == 0
+        mixed_clone = p[const.I_SEX].lower() == 'mixed' and len(terms) == 0
         # Make a comment to indicate record has been cloned
-        if len(num) > 1 or mixed_clone:
-            sex = p_c[const.I_SEX].strip()
-            stage = p_c[const.I_STAGE].strip()
-            s_c[const.S_IMPORTTYPE] = utils.append_comment(
-                    s_c[const.S_IMPORTTYPE], msg)
+        if len(terms) > 1 or mixed_clone:
+            sex = p[const.I_SEX].strip()
+            stage = p[const.I_STAGE].strip()
+            s[const.S_IMPORTTYPE] = utils.append_comment(s[const.S_IMPORTTYPE], msg)
             note = msg_note.format(c, sex, stage)
-            s_c[const.S_IMPORTNOTE] = (s_c[const.S_IMPORTNOTE] + ' ' + note if
-                len(s_c[const.S_IMPORTNOTE]) > 0 else note)
+            s[const.S_IMPORTNOTE] = (s[const.S_IMPORTNOTE] + ' ' + note if
+                len(s[const.S_IMPORTNOTE]) > 0 else note)
 
         if mixed_clone:
-            stage = p_c[const.I_STAGE].lower().strip()
+            stage = p[const.I_STAGE].lower().strip()
             if stage in const.STAGE_TERMS:
                 stage = const.STAGE_TERMS[stage].capitalize()
-            s_c[const.S_SEXSTAGE] = f'{stage} {const.MALE}'.strip()
-            s_c = self.swift[0].copy()
+            s[const.S_SEXSTAGE] = f'{stage} {const.MALE}'.strip()
+            s_c = s.copy()
             s_c[const.S_SEXSTAGE] = f'{stage} {const.FEMALE}'.strip()
             self.swift.append(s_c)
 
-        # Process each pair of number and term
-        for i, term in enumerate(num):
-            sex = ''
-            stage = ''
-            spec = trm[i+1].lower().strip()
-            spec = re.sub(r'[(),]', '', spec)
-            # Parse spec into separate words and check against sex/stage terms
-            words = spec.split()
-            for word in words:
-                # Is this a sex/stage term?
-                if word in const.STAGE_TERMS:
-                    stage = const.STAGE_TERMS[word].capitalize()
-                elif word in const.SEX_TERMS:
-                    sex = const.SEX_TERMS[word].lower()
+        # Each term after the first produces a clone of the first record
+        for i, (abund, stage, sex) in enumerate(terms):
+            s_c = s.copy() if i > 0 else s
             # No stage found in comment - use 'Stage' field
             if len(stage) == 0:
-                stage = p_c[const.I_STAGE]
-
-            s_c[const.S_ABUNDANCE] = term.strip()
+                stage = p[const.I_STAGE]
+            s_c[const.S_ABUNDANCE] = abund
             s_c[const.S_SEXSTAGE] = f'{stage} {sex}'.strip()
-            # Avoid duplicating first record
             if i > 0:
                 self.swift.append(s_c)
-            # Prepare for next loop
-            s_c = self.swift[0].copy()
 
     # --------------------------------------------------------------------------
 
@@ -278,41 +296,32 @@ class Rules:
         Returns: 
             N/A
         '''
-        self.swift.clear()
-        s = {}
-        c = self.record[const.I_COUNT_OF_SEX_OR_STAGE].lower()
-        n = utils.word_to_num(c)
-        if n is not None:
-            c = str(n)
-
-        stage = '' if self.record[const.I_STAGE].lower() == self.NO_RECORD \
-                    else self.record[const.I_STAGE].capitalize()
-        sex = '' if self.record[const.I_SEX].lower() == self.NO_RECORD \
-                    else self.record[const.I_SEX].lower()
-        s[const.S_KEY] = self.record[const.I_KEY]
-        s[const.S_IMPORTTYPE] = ''
-        s[const.S_IMPORTNOTE] = ''
-        s[const.S_NAME] = self.record[const.I_TAXON]
-        s[const.S_DATE] = self.record[const.I_DATE_FROM]
-        s[const.S_LOCATION] = self.record[const.I_SITE_NAME]
-        s[const.S_GRID_REFERENCE] = self.record[const.I_OUTPUT_MAP_REF]
-        s[const.S_ABUNDANCE] = c
-        s[const.S_SEXSTAGE] = f'{stage} {sex}'.strip()
-        s[const.S_RECORD_TYPE] = ''
-        s[const.S_OBSERVER] = ''
-        s[const.S_DETERMINER] = ''
-        s[const.S_COMMENTS] = ''
-        s[const.S_DETERMINATION_TYPE] = ''
-        s[const.S_DETERMINAION_COMMENT] = ''
+        r = self.record
+        c = self.counts.get_abundance(r[const.I_COUNT_OF_SEX_OR_STAGE])
+
+        stage = '' if r[const.I_STAGE].lower() == self.NO_RECORD \
+                    else r[const.I_STAGE].capitalize()
+        sex = '' if r[const.I_SEX].lower() == self.NO_RECORD \
+                    else r[const.I_SEX].lower()
+        # Columns not set here are initialised to ''
+        s = SwiftRow()
+        v, ix = s.values, SwiftRow.INDEX
+        v[ix[const.S_KEY]] = r[const.I_KEY]
+        v[ix[const.S_NAME]] = r[const.I_TAXON]
+        v[ix[const.S_DATE]] = r[const.I_DATE_FROM]
+        v[ix[const.S_LOCATION]] = r[const.I_SITE_NAME]
+        v[ix[const.S_GRID_REFERENCE]] = r[const.I_OUTPUT_MAP_REF]
+        v[ix[const.S_ABUNDANCE]] = c
+        v[ix[const.S_SEXSTAGE]] = f'{stage} {sex}'.strip()
         # Initialise additional columns which are copied without processing
         for col in const.I_COLUMNSEXTRA:
-            s[col] = self.record[col] if col in self.record else ''
+            v[ix[col]] = r[col] if col in r else ''
 
-        self.swift.append(s)
+        self.swift = [s]
 
     # --------------------------------------------------------------------------
 
-    def is_skip(self, records: Records, dupedict: DupeDict) -> tuple[str, str]:
+    def is_skip(self, records: SwiftRows, dupedict: DupeDict) -> tuple[str, str]:
         '''Perform tests to determine whether record should be skipped.
         Args: 
             records (Records) - potential new record, including clones
@@ -323,11 +332,24 @@ class Rules:
         rvs = []   # list of tuples returned from individual tests
         # Run tests
         rvs.append(self.is_skip_duplicate(records, dupedict))
-        rvs.append(self.is_skip_gridref())
-        rvs.append(self.is_skip_licence())
-        rvs.append(self.is_skip_rank())
-        rvs.append(self.is_skip_region())
-        rvs.append(self.is_skip_verification())
+        mode = self.crosscheck.config.fast_reject
+        if mode == const.FAST_REJECT_OFF:
+            rvs.append(self.is_skip_gridref())
+            rvs.append(self.is_skip_licence())
+            rvs.append(self.is_skip_rank())
+            rvs.append(self.is_skip_region())
+            rvs.append(self.is_skip_verification())
+        else:
+            # Cheap tests first - region test only if record not yet rejected
+            rejected = len(rvs[0][0]) > 0
+            for test in (self.is_skip_gridref, self.is_skip_licence,
+                         self.is_skip_rank, self.is_skip_verification):
+                if rejected and mode == const.FAST_REJECT_FIRST:
+                    break
+                rvs.append(test())
+                rejected = rejected or len(rvs[-1][0]) > 0
+            if not rejected:
+                rvs.append(self.is_skip_region())
         # Process results of all tests into two strings returned as a tuple
         rv_n = rv_t = ''
         for rv in rvs:
@@ -338,7 +360,7 @@ class Rules:
 
     # --------------------------------------------------------------------------
 
-    def is_skip_duplicate(self, records: Records, dupedict: DupeDict) -> tuple[str, str]:
+    def is_skip_duplicate(self, records: SwiftRows, dupedict: DupeDict) -> tuple[str, str]:
         '''Determine whether record should be skipped because it is a duplicate.
         Args: 
             record (Record) - potential new record, including duplicates
@@ -360,9 +382,10 @@ class Rules:
         )
         skip_str = '[Duplicate: "{}"] '
         rv_n = rv_t = ''
-        if dupecheck in dupedict:
+        first = dupedict.get(dupecheck)
+        if first is not None:
             rv_t = ' Duplicate;'
-            rv_n = skip_str.format(dupedict[dupecheck])
+            rv_n = skip_str.format(first)
         else:
             dupedict[dupecheck] = rec[const.S_KEY]
 
@@ -395,16 +418,8 @@ class Rules:
         Returns: 
             (string, string) - type/note describing reason for skip, else ''
         '''
-        skip_str = '[Licence: "{}"] '
-        l_u = self.record[const.I_LICENCE].upper()     # licence
-        r_l = self.record[const.I_RECORDER].lower()    # recorder
-        rv_n = ''
-        if (l_u in {'CC BY', 'CC BY-NC'} and
-                not self.crosscheck.is_permission_granted(r_l)):
-            rv_n = skip_str.format(l_u)
-
-        rv_t = ' Licence;' if len(rv_n) > 0 else ''
-        return rv_t, rv_n
+        return self.memo_licence(self.record[const.I_LICENCE],
+                                 self.record[const.I_RECORDER])
 
     # --------------------------------------------------------------------------
 
@@ -415,28 +430,9 @@ class Rules:
         Returns: 
             (string, string) - type/note describing reason for skip, else ''
         '''
-        skip_str = '[Rank: "{}"; Kingdom: "{}"; Order: "{}"; Taxon: "{}"] '
-        k_l = self.record[const.I_KINGDOM].lower()  # kingdom
-        o_l = self.record[const.I_ORDER].lower()    # order
-        r_l = self.record[const.I_RANK].lower()     # rank
-        t_l = self.record[const.I_TAXON].lower()    # taxon
-        rv_n = ''
-        if r_l in ['domain', 'kingdom', 'class', 'order']:
-            # Not acceptable
-            rv_n = skip_str.format(r_l, k_l, o_l, t_l)
-        elif r_l == 'family':
-            # Acceptable for insects only (possibly with some exceptions)
-            if (o_l not in const.ORDERS_INSECTA or
-                    self.crosscheck.is_excluded_taxon(t_l)):
-                rv_n = skip_str.format(r_l, k_l, o_l, t_l)
-        elif r_l == 'genus':
-            # Acceptable for insects, plants and bats only
-            if (o_l not in const.ORDERS_INSECTA and k_l != 'plantae' and
-                o_l != 'chiroptera'):
-                rv_n = skip_str.format(r_l, k_l, o_l, t_l)
-
-        rv_t = ' Rank;' if len(rv_n) > 0 else ''
-        return rv_t, rv_n
+        p = self.record
+        return self.memo_rank(p[const.I_RANK], p[const.I_KINGDOM], p[const.I_ORDER],
+                              p[const.I_TAXON])
 
     # --------------------------------------------------------------------------
 
@@ -467,9 +463,104 @@ class Rules:
         Returns: 
             (string, string) - type/note describing reason for skip, else ''
         '''
+        return self.memo_verification(self.record[const.I_VERIFICATION_STATUS_1],
+                                      self.record[const.I_VERIFICATION_STATUS_2])
+
+    # --------------------------------------------------------------------------
+
+    def log_cache_stats(self) -> None:
+        '''Write rule cache statistics to log.
+        Args: 
+            N/A
+        Returns: 
+            N/A
+        '''
+        for memo in (self.memo_identity, self.memo_licence, self.memo_rank,
+                     self.memo_verification):
+            memo.log_stats()
+        self.crosscheck.log_cache_stats()
+
+    # --------------------------------------------------------------------------
+
+    def set_record(self, record: Record) -> None:
+        '''Set the iRecord record to be assessed. The record is not modified.
+        Args: 
+            record (Record) - iRecord record
+        Returns: 
+            N/A
+        '''
+        self.record = record
+
+    # --------------------------------------------------------------------------
+
+    def skip_licence(self, licence: str, recorder: str) -> tuple[str, str]:
+        '''Determine whether a record should be skipped based upon its licence.
+        Args: 
+            licence (string) - iRecord licence
+            recorder (string) - iRecord recorder
+        Returns: 
+            (string, string) - type/note describing reason for skip, else ''
+        '''
+        skip_str = '[Licence: "{}"] '
+        l_u = licence.upper()       # licence
+        r_l = recorder.lower()      # recorder
+        rv_n = ''
+        if (l_u in {'CC BY', 'CC BY-NC'} and
+                not self.crosscheck.is_permission_granted(r_l)):
+            rv_n = skip_str.format(l_u)
+
+        rv_t = ' Licence;' if len(rv_n) > 0 else ''
+        return rv_t, rv_n
+
+    # --------------------------------------------------------------------------
+
+    def skip_rank(self, rank: str, kingdom: str, order: str,
+                  taxon: str) -> tuple[str, str]:
+        '''Determine whether a record should be skipped based upon its rank.
+        Args: 
+            rank (string) - iRecord taxon rank
+            kingdom (string) - iRecord kingdom
+            order (string) - iRecord order
+            taxon (string) - iRecord taxon
+        Returns: 
+            (string, string) - type/note describing reason for skip, else ''
+        '''
+        skip_str = '[Rank: "{}"; Kingdom: "{}"; Order: "{}"; Taxon: "{}"] '
+        k_l = kingdom.lower()       # kingdom
+        o_l = order.lower()         # order
+        r_l = rank.lower()          # rank
+        t_l = taxon.lower()         # taxon
+        rv_n = ''
+        if r_l in ['domain', 'kingdom', 'class', 'order']:
+            # Not acceptable
+            rv_n = skip_str.format(r_l, k_l, o_l, t_l)
+        elif r_l == 'family':
+            # Acceptable for insects only (possibly with some exceptions)
+            if (o_l not in const.ORDERS_INSECTA or
+                    self.crosscheck.is_excluded_taxon(t_l)):
+                rv_n = skip_str.format(r_l, k_l, o_l, t_l)
+        elif r_l == 'genus':
+            # Acceptable for insects, plants and bats only
+            if (o_l not in const.ORDERS_INSECTA and k_l != 'plantae' and
+                o_l != 'chiroptera'):
+                rv_n = skip_str.format(r_l, k_l, o_l, t_l)
+
+        rv_t = ' Rank;' if len(rv_n) > 0 else ''
+        return rv_t, rv_n
+
+    # --------------------------------------------------------------------------
+
+    def skip_verification(self, status_1: str, status_2: str) -> tuple[str, str]:
+        '''Determine whether a record should be skipped based upon its verification.
+        Args: 
+            status_1 (string) - iRecord verification status 1
+            status_2 (string) - iRecord verification status 2
+        Returns: 
+            (string, string) - type/note describing reason for skip, else ''
+        '''
         skip_str = '[Verification 1: "{}"; Verification 2: "{}"] '
-        v1_l = self.record[const.I_VERIFICATION_STATUS_1].lower()   # verify 1
-        v2_l = self.record[const.I_VERIFICATION_STATUS_2].lower()   # verify 2
+        v1_l = status_1.lower()     # verify 1
+        v2_l = status_2.lower()     # verify 2
         if (v1_l in {'accepted', 'queried', 'unconfirmed'} and
             v2_l in {'considered correct', 'correct', 'not reviewed',
                      'plausible', 'unconfirmed', ''}):
@@ -0,0 +1,286 @@
+'''
+About  : Implements the SkipEngine class which applies the record skip tests to
+         all of the records of a file at once, as column-wise operations. The
+         results are the same as those of Rules.is_skip applied to each record.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from operator import itemgetter
+from typing import TypeAlias
+
+import numpy as np
+import pandas as pd
+
+import const
+from crosscheck import Crosschecker
+from dupeindex import DupeIndex
+from dupestore import DupeStore
+from rules import Records
+from swiftrow import SwiftRow, SwiftRows
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+# Result of a skip test: (mask of records to skip, note for each record)
+SkipMask: TypeAlias = tuple[np.ndarray, pd.Series]
+
+# ------------------------------------------------------------------------------
+
+class SkipEngine:
+    '''Class which determines which records of a file should be skipped.'''
+
+    # Input columns used by the tests
+    COLUMNS: tuple[str, ...] = (
+        const.I_KINGDOM,
+        const.I_LICENCE,
+        const.I_ORDER,
+        const.I_OUTPUT_MAP_REF,
+        const.I_RANK,
+        const.I_RECORDER,
+        const.I_TAXON,
+        const.I_VERIFICATION_STATUS_1,
+        const.I_VERIFICATION_STATUS_2)
+
+    # Swift columns which identify a duplicate record
+    DUPE_COLUMNS: tuple[str, ...] = (
+        const.S_NAME,
+        const.S_DATE,
+        const.S_LOCATION,
+        const.S_GRID_REFERENCE,
+        const.S_ABUNDANCE,
+        const.S_SEXSTAGE,
+        const.S_RECORD_TYPE,
+        const.S_OBSERVER,
+        const.S_DETERMINER)
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, crosscheck: Crosschecker, dupestore: DupeStore|None=None) -> None:
+        '''Constructor.
+        Args:
+            crosscheck (CrossChecker) - instance of object used for lookups
+            dupestore (DupeStore) - records of earlier files (None = this file only)
+        Returns:
+            N/A
+        '''
+        self.crosscheck: Crosschecker = crosscheck
+        self.dupestore: DupeStore|None = dupestore
+        # Key of the first record with the values of each record tested
+        self.first: dict[tuple, int]|DupeIndex = (DupeIndex() if
+            crosscheck.config.dupe_hash else {})
+        # "file: key" of the earlier file's record duplicated by a first record
+        self.earlier: dict[int, str] = {}
+
+    # --------------------------------------------------------------------------
+
+    def get_frame(self, records: Records) -> pd.DataFrame:
+        '''Return the columns of records used by the tests.
+        Args:
+            records (Records) - iRecord records
+        Returns:
+            (DataFrame) - record columns
+        '''
+        return pd.DataFrame({col: [rec[col] for rec in records] for col in self.COLUMNS},
+                            dtype=object)
+
+    # --------------------------------------------------------------------------
+
+    def is_skip(self, records: Records, swift: list[SwiftRows],
+                cheap: list[tuple[str, SkipMask]]|None=None) -> tuple[list[str], list[str]]:
+        '''Perform tests to determine which records should be skipped.
+        Args:
+            records (Records) - iRecord records
+            swift (list of SwiftRows) - Swift records (including clones)
+                                        produced from each iRecord record
+            cheap (list of tuples) - results of skip_cheap for the records, if
+                                     already known
+        Returns:
+            (list of strings, list of strings) - type/note with reasons for
+                                                 skip for each record, else ''
+        '''
+        df = self.get_frame(records)
+        if cheap is None:
+            cheap = self.skip_cheap(df)
+        tests = [('Duplicate', self.skip_duplicate(swift))] + cheap
+        mode = self.crosscheck.config.fast_reject
+        if mode == const.FAST_REJECT_OFF:
+            tests.insert(4, ('Region', self.skip_region(df)))
+        else:
+            # Cheap tests first - region test only of records not yet rejected
+            rejected = np.zeros(len(df), dtype=bool)
+            for i, (name, (mask, note)) in enumerate(tests):
+                if mode == const.FAST_REJECT_FIRST:
+                    mask = mask & ~rejected
+                    tests[i] = (name, (mask, note))
+                rejected |= mask
+            tests.append(('Region', self.skip_region(df, ~rejected)))
+        # Process results of all tests into two strings for each record
+        rv_t = pd.Series('', index=df.index, dtype=object)
+        rv_n = pd.Series('', index=df.index, dtype=object)
+        for name, (mask, note) in tests:
+            rv_t = rv_t.where(~mask, rv_t + f' {name};')
+            rv_n = rv_n.where(~mask, rv_n + note)
+
+        return (rv_t.str.strip(' ;').tolist(), rv_n.str.strip(' ;').tolist())
+
+    # --------------------------------------------------------------------------
+
+    def skip_cheap(self, df: pd.DataFrame) -> list[tuple[str, SkipMask]]:
+        '''Apply the tests which need neither the region nor other records, 
+           i.e. those which skip a record whatever its location.
+        Args:
+            df (DataFrame) - record columns
+        Returns:
+            (list of tuples) - name and result of each test
+        '''
+        return [('Gridref', self.skip_gridref(df)),
+                ('Licence', self.skip_licence(df)),
+                ('Rank', self.skip_rank(df)),
+                ('Verification', self.skip_verification(df))]
+
+    # --------------------------------------------------------------------------
+
+    def skip_duplicate(self, swift: list[SwiftRows]) -> SkipMask:
+        '''Determine which records duplicate an earlier record of the file, or of
+           an earlier file if a duplicate store is used. Records tested by
+           earlier calls count as earlier records of the file.
+        Args:
+            swift (list of SwiftRows) - Swift records produced from each record
+        Returns:
+            (SkipMask) - records to skip, note naming the key of earlier record
+        '''
+        dupe = itemgetter(*(SwiftRow.INDEX[col] for col in self.DUPE_COLUMNS))
+        key = SwiftRow.INDEX[const.S_KEY]
+        keys = [res[0].values[key] for res in swift]
+        first = [self.first.setdefault(dupe(res[0].values), k)
+                 for res, k in zip(swift, keys)]
+        mask = np.array([f != k for f, k in zip(first, keys)], dtype=bool)
+        if self.dupestore is not None:
+            # First records of the file which were found in an earlier file
+            digests = {keys[i]: DupeIndex.fingerprint(dupe(swift[i][0].values))
+                       for i in np.flatnonzero(~mask)}
+            found = self.dupestore.lookup(list(digests.values()))
+            for k, d in digests.items():
+                if d in found:
+                    self.earlier[k] = found[d]
+                else:
+                    self.dupestore.add(d, k)
+            # Later records of the file take the result of their first record
+            first = [self.earlier.get(f, f) for f in first]
+            mask |= np.array([k in self.earlier for k in keys], dtype=bool)
+        note = '[Duplicate: "' + pd.Series(first, dtype=object).astype(str) + '"] '
+
+        return mask, note
+
+    # --------------------------------------------------------------------------
+
+    def skip_gridref(self, df: pd.DataFrame) -> SkipMask:
+        '''Determine which records should be skipped based upon their gridref.
+        Args:
+            df (DataFrame) - record columns
+        Returns:
+            (SkipMask) - records to skip, note
+        '''
+        g = df[const.I_OUTPUT_MAP_REF]
+        mask = (g.str.len() < 6).to_numpy()
+
+        return mask, '[Gridref: "' + g + '"] '
+
+    # --------------------------------------------------------------------------
+
+    def skip_licence(self, df: pd.DataFrame) -> SkipMask:
+        '''Determine which records should be skipped based upon their licence.
+        Args:
+            df (DataFrame) - record columns
+        Returns:
+            (SkipMask) - records to skip, note
+        '''
+        l_u = df[const.I_LICENCE].str.upper()
+        r_l = df[const.I_RECORDER].str.lower()
+        mask = l_u.isin(['CC BY', 'CC BY-NC']).to_numpy(copy=True)
+        # Permission is only looked up once for each recorder
+        names = r_l[mask]
+        granted = names.map({r: self.crosscheck.is_permission_granted(r)
+                             for r in names.unique()})
+        mask[mask] = ~granted.to_numpy(dtype=bool)
+
+        return mask, '[Licence: "' + l_u + '"] '
+
+    # --------------------------------------------------------------------------
+
+    def skip_rank(self, df: pd.DataFrame) -> SkipMask:
+        '''Determine which records should be skipped based upon their rank.
+        Args:
+            df (DataFrame) - record columns
+        Returns:
+            (SkipMask) - records to skip, note
+        '''
+        k_l = df[const.I_KINGDOM].str.lower()
+        o_l = df[const.I_ORDER].str.lower()
+        r_l = df[const.I_RANK].str.lower()
+        t_l = df[const.I_TAXON].str.lower()
+        insect = o_l.isin(list(const.ORDERS_INSECTA))
+        # Not acceptable
+        mask = r_l.isin(['domain', 'kingdom', 'class', 'order'])
+        # Family acceptable for insects only (possibly with some exceptions)
+        family = r_l == 'family'
+        excluded = t_l[family].map({t: self.crosscheck.is_excluded_taxon(t)
+                                    for t in t_l[family].unique()})
+        mask |= family & (~insect | excluded.reindex(df.index, fill_value=False)
+                          .astype(bool))
+        # Genus acceptable for insects, plants and bats only
+        mask |= ((r_l == 'genus') & ~insect & (k_l != 'plantae') &
+                 (o_l != 'chiroptera'))
+        note = ('[Rank: "' + r_l + '"; Kingdom: "' + k_l + '"; Order: "' + o_l +
+                '"; Taxon: "' + t_l + '"] ')
+
+        return mask.to_numpy(dtype=bool), note
+
+    # --------------------------------------------------------------------------
+
+    def skip_region(self, df: pd.DataFrame, test: np.ndarray|None=None) -> SkipMask:
+        '''Determine which records should be skipped based upon whether they are
+           inside/outside the in-scope VC region.
+        Args:
+            df (DataFrame) - record columns
+            test (numpy array of bool) - records to be tested (None if all)
+        Returns:
+            (SkipMask) - records to skip, note
+        '''
+        g = df[const.I_OUTPUT_MAP_REF]
+        mask = np.zeros(len(df), dtype=bool)
+        if test is None:
+            test = np.ones(len(df), dtype=bool)
+        mask[test] = ~self.crosscheck.georegion.tally_gridrefs(g[test].tolist())
+
+        return mask, '[Region: "' + g + '"] '
+
+    # --------------------------------------------------------------------------
+
+    def skip_verification(self, df: pd.DataFrame) -> SkipMask:
+        '''Determine which records should be skipped based upon their
+           verification.
+        Args:
+            df (DataFrame) - record columns
+        Returns:
+            (SkipMask) - records to skip, note
+        '''
+        v1_l = df[const.I_VERIFICATION_STATUS_1].str.lower()
+        v2_l = df[const.I_VERIFICATION_STATUS_2].str.lower()
+        ok = (v1_l.isin(['accepted', 'queried', 'unconfirmed']) &
+              v2_l.isin(['considered correct', 'correct', 'not reviewed',
+                         'plausible', 'unconfirmed', '']))
+        note = '[Verification 1: "' + v1_l + '"; Verification 2: "' + v2_l + '"] '
+
+        return ~ok.to_numpy(dtype=bool), note
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
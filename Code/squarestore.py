@@ -0,0 +1,128 @@
+'''
+About  : Implements the SquareStore class which holds a de-duplicated set of
+         grid squares, with a count of occurrences of each, in compact arrays.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from typing import Final, TypeAlias
+
+import numpy as np
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+# Grid square: (easting, northing, size) of south-west corner/side in metres
+Square: TypeAlias = tuple[int, int, int]
+
+# ------------------------------------------------------------------------------
+
+class SquareStore:
+    '''Class which stores grid squares in growable NumPy arrays.'''
+
+    INITIAL_CAPACITY: Final[int] = 1024
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+        '''Constructor.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.index: dict[Square, int] = {}  # row of each distinct square
+        self.squares: np.ndarray = np.zeros((self.INITIAL_CAPACITY, 3), dtype=np.int64)
+        self.counts: np.ndarray = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self.total: int = 0                 # number of occurrences of all squares
+
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        '''Return the number of distinct squares.'''
+        return len(self.index)
+
+    # --------------------------------------------------------------------------
+
+    def add(self, square: Square, count: int=1) -> None:
+        '''Add one or more occurrences of a square.
+        Args:
+            square (Square) - grid square
+            count (int) - number of occurrences
+        Returns:
+            N/A
+        '''
+        row = self.index.get(square)
+        if row is None:
+            row = len(self.index)
+            if row == len(self.counts):
+                self.grow()
+            self.index[square] = row
+            self.squares[row] = square
+        self.counts[row] += count
+        self.total += count
+
+    # --------------------------------------------------------------------------
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        '''Return the distinct squares and their counts.
+        Args:
+            N/A
+        Returns:
+            (tuple of arrays) - squares (rows of easting, northing, size), counts
+        '''
+        n = len(self.index)
+        return self.squares[:n], self.counts[:n]
+
+    # --------------------------------------------------------------------------
+
+    def clear(self) -> None:
+        '''Remove all squares, retaining allocated storage.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.counts[:len(self.index)] = 0
+        self.index.clear()
+        self.total = 0
+
+    # --------------------------------------------------------------------------
+
+    def grow(self) -> None:
+        '''Double the capacity of the arrays.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        cap = 2 * len(self.counts)
+        self.squares = np.resize(self.squares, (cap, 3))
+        self.counts = np.concatenate([self.counts, np.zeros(cap - len(self.counts),
+                                                            dtype=np.int64)])
+
+    # --------------------------------------------------------------------------
+
+    def vertices(self) -> np.ndarray:
+        '''Return the corner coordinates of the distinct squares.
+        Args:
+            N/A
+        Returns:
+            (numpy array) - shape (squares, 4, 2) of eastings/northings
+        '''
+        sq, _ = self.arrays()
+        e, n, s = sq[:, 0], sq[:, 1], sq[:, 2]
+        return np.stack([np.stack([e, n], axis=1),
+                         np.stack([e, n + s], axis=1),
+                         np.stack([e + s, n + s], axis=1),
+                         np.stack([e + s, n], axis=1)], axis=1)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -0,0 +1,239 @@
+'''
+About  : Implements the SwiftBuilder class which creates the Swift records for
+         all of the records of a file at once, as column-wise operations. The
+         results are the same as those of Rules.get_swift applied to each record.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+import const
+import utils
+from rules import Records, Rules
+from swiftrow import SwiftRow, SwiftRows
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+class SwiftBuilder:
+    '''Class which transforms the records of a file into Swift format. Only
+       records which may need to be cloned are passed to Rules individually.'''
+
+    # Input columns used to create Swift records
+    COLUMNS: tuple[str, ...] = (
+        const.I_COMMENT,
+        const.I_COUNT_OF_SEX_OR_STAGE,
+        const.I_DATE_FROM,
+        const.I_DETERMINER,
+        const.I_IMAGES,
+        const.I_KEY,
+        const.I_LICENCE,
+        const.I_OUTPUT_MAP_REF,
+        const.I_RECORDER,
+        const.I_RECORDER_CERTAINTY,
+        const.I_RECORDKEY,
+        const.I_SAMPLE_COMMENT,
+        const.I_SAMPLE_METHOD,
+        const.I_SEX,
+        const.I_SITE_NAME,
+        const.I_SOURCE,
+        const.I_STAGE,
+        const.I_TAXON,
+        const.I_TAXON_GROUP,
+        const.I_VERIFICATION_STATUS_2,
+        const.I_VERIFIED_ON,
+        const.I_VERIFIER)
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, rules: Rules) -> None:
+        '''Constructor.
+        Args:
+            rules (Rules) - instance of object used for records needing cloning
+        Returns:
+            N/A
+        '''
+        self.rules: Rules = rules
+
+    # --------------------------------------------------------------------------
+
+    def build(self, records: Records) -> list[SwiftRows]:
+        '''Create the Swift records of each iRecord record.
+        Args:
+            records (Records) - iRecord records
+        Returns:
+            (list of SwiftRows) - Swift records (including clones) of each record
+        '''
+        df = pd.DataFrame({col: [rec[col] for rec in records] for col in self.COLUMNS},
+                          dtype=object)
+        cols: dict[str, pd.Series] = {col: pd.Series('', index=df.index, dtype=object)
+                                      for col in const.S_COLUMNS}
+        self.init_swift(df, cols)
+        self.get_swift_identity(df, cols)
+        self.get_swift_recordtype(df, cols)
+        self.get_swift_comment(df, cols)
+        for col in const.I_COLUMNSEXTRA:
+            cols[col] = pd.Series([rec.get(col, '') for rec in records], dtype=object)
+        # Convert the columns into one Swift record for each iRecord record
+        values = [cols[col].tolist() for col in const.S_COLUMNS]
+        rv = [[SwiftRow(list(v))] for v in zip(*values)]
+        # Records whose count may name several sexes/stages are completed singly
+        counts = self.rules.counts
+        clone = self.map_unique(lambda c: counts.parse(c)[1:] != (None, False),
+                                df[const.I_COUNT_OF_SEX_OR_STAGE])
+        for ix in np.flatnonzero(clone.to_numpy(dtype=bool)):
+            self.rules.set_record(records[ix])
+            rv[ix] = self.rules.get_swift_clones(rv[ix][0])
+        log.debug('Swift records of %i records created singly', int(clone.sum()))
+
+        return rv
+
+    # --------------------------------------------------------------------------
+
+    def get_swift_comment(self, df: pd.DataFrame, cols: dict[str, pd.Series]) -> None:
+        '''Generate the comment and determination columns from multiple fields.
+        Args:
+            df (DataFrame) - record columns
+            cols (dict of Series) - Swift columns
+        Returns:
+            N/A
+        '''
+        # ----------------------------------------------------------------------
+        def formatstr(name: str, value: str) -> str:
+            '''Format a sub-section of the comment string.'''
+            v = value.strip()
+            return f'[{name}: "{v}"] ' if len(v) > 0 else ''
+        # ----------------------------------------------------------------------
+        def formatcol(name: str, col: pd.Series) -> pd.Series:
+            '''Format a sub-section of the comment strings.'''
+            return self.map_unique(lambda v: formatstr(name, v), col)
+        # ----------------------------------------------------------------------
+
+        v = df[const.I_VERIFIER]
+        vos = df[const.I_VERIFIED_ON]
+        # Each distinct date/time is converted once
+        dto = pd.Series(vos.unique(), dtype=object)
+        dto = dto[dto != '']
+        dates = dict(zip(dto, pd.to_datetime(dto, format='%d/%m/%Y %H:%M')
+                         .dt.strftime('%d/%m/%Y')))
+        dates[''] = ''
+        dts = vos.map(dates)
+        com = (formatcol('iRecord Key', df[const.I_RECORDKEY]) +
+               formatcol('Source', df[const.I_SOURCE]) +
+               formatcol('Recorder certainty', df[const.I_RECORDER_CERTAINTY]) +
+               formatcol('Comment', df[const.I_COMMENT]) +
+               formatcol('Sample Comment', df[const.I_SAMPLE_COMMENT]) +
+               formatcol('Verifier', v) +
+               formatcol('Verified on', dts) +
+               formatcol('Licence', df[const.I_LICENCE]))
+        det_com = ('Verified by ' + v + ' ').where(v != '', '') + dts
+        v2 = df[const.I_VERIFICATION_STATUS_2]
+
+        cols[const.S_COMMENTS] = com
+        cols[const.S_DETERMINAION_COMMENT] = det_com
+        cols[const.S_DETERMINATION_TYPE] = v2.where(
+            v2.str.lower() != 'not reviewed', 'Requires Confirmation')
+
+    # --------------------------------------------------------------------------
+
+    def get_swift_identity(self, df: pd.DataFrame, cols: dict[str, pd.Series]) -> None:
+        '''Generate the observer and determiner columns.
+        Args:
+            df (DataFrame) - record columns
+            cols (dict of Series) - Swift columns
+        Returns:
+            N/A
+        '''
+        source = df[const.I_SOURCE]
+        cols[const.S_OBSERVER] = self.map_unique(self.rules.get_identity,
+                                                 df[const.I_RECORDER], source)
+        cols[const.S_DETERMINER] = self.map_unique(self.rules.get_identity,
+                                                   df[const.I_DETERMINER], source)
+
+    # --------------------------------------------------------------------------
+
+    def get_swift_recordtype(self, df: pd.DataFrame, cols: dict[str, pd.Series]) -> None:
+        '''Generate the record type column, flagging unknown sample methods.
+        Args:
+            df (DataFrame) - record columns
+            cols (dict of Series) - Swift columns
+        Returns:
+            N/A
+        '''
+        rt = self.map_unique(self.rules.crosscheck.get_record_type,
+                             df[const.I_SAMPLE_METHOD], df[const.I_IMAGES])
+        unknown = rt.isna()
+        note = ('[Record Type: "' + df[const.I_SAMPLE_METHOD] + '"; Comment: "' +
+                df[const.I_COMMENT] + '"]')
+
+        cols[const.S_RECORD_TYPE] = rt.where(~unknown, '')
+        cols[const.S_IMPORTTYPE] = cols[const.S_IMPORTTYPE].where(~unknown,
+            utils.append_comment('', 'Record Type'))
+        cols[const.S_IMPORTNOTE] = cols[const.S_IMPORTNOTE].where(~unknown, note)
+
+    # --------------------------------------------------------------------------
+
+    def init_swift(self, df: pd.DataFrame, cols: dict[str, pd.Series]) -> None:
+        '''Initialise the Swift columns copied from the record or derived from
+           the count, sex and stage (see Rules.init_swift).
+        Args:
+            df (DataFrame) - record columns
+            cols (dict of Series) - Swift columns
+        Returns:
+            N/A
+        '''
+        count = df[const.I_COUNT_OF_SEX_OR_STAGE]
+        abund = self.map_unique(self.rules.counts.get_abundance, count)
+        found = self.map_unique(self.rules.crosscheck.get_abundance,
+                                df[const.I_TAXON_GROUP], count)
+        match = found.str[0].astype(bool)
+        stage = df[const.I_STAGE].where(
+            df[const.I_STAGE].str.lower() != Rules.NO_RECORD, '').str.capitalize()
+        sex = df[const.I_SEX].str.lower()
+        sex = sex.where(sex != Rules.NO_RECORD, '')
+
+        cols[const.S_KEY] = df[const.I_KEY]
+        cols[const.S_NAME] = df[const.I_TAXON]
+        cols[const.S_DATE] = df[const.I_DATE_FROM]
+        cols[const.S_LOCATION] = df[const.I_SITE_NAME]
+        cols[const.S_GRID_REFERENCE] = df[const.I_OUTPUT_MAP_REF]
+        cols[const.S_ABUNDANCE] = found.str[1].where(match, abund)
+        cols[const.S_SEXSTAGE] = (stage + ' ' + sex).str.strip()
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def map_unique(func: Callable[..., Any], *cols: pd.Series) -> pd.Series:
+        '''Apply a function to each row of one or more columns, calling it only
+           once for each distinct combination of values.
+        Args:
+            func (Callable) - function taking one value from each column
+            cols (Series) - columns
+        Returns:
+            (Series) - result for each row
+        '''
+        # Number the distinct combinations in order of first appearance
+        codes = np.zeros(len(cols[0]), dtype=np.int64)
+        for col in cols:
+            c, u = pd.factorize(col.to_numpy(), use_na_sentinel=False)
+            codes, _ = pd.factorize(codes * len(u) + c)
+        _, first = np.unique(codes, return_index=True)
+        keys = zip(*(col.to_numpy()[first] for col in cols))
+        results = np.fromiter((func(*key) for key in keys), dtype=object,
+                              count=len(first))
+        return pd.Series(results[codes], index=cols[0].index, dtype=object)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
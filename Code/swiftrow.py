@@ -0,0 +1,95 @@
+'''
+About  : Implements the SwiftRow class which holds a single record in Swift
+         format as a fixed list of column values.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from collections.abc import Iterator, MutableMapping
+from typing import Any, Final, TypeAlias
+
+import const
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+class SwiftRow(MutableMapping):
+    '''Class which behaves as a dict keyed by the Swift columns, but stores the
+       values in a list to avoid the cost of building and copying dicts.'''
+
+    __slots__ = ('values',)
+
+    COLUMNS: Final[list[str]] = const.S_COLUMNS
+    INDEX: Final[dict[str, int]] = {col: i for i, col in enumerate(const.S_COLUMNS)}
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, values: list[Any]|None=None) -> None:
+        '''Constructor.
+        Args:
+            values (list) - column values in Swift column order (None if empty)
+        Returns:
+            N/A
+        '''
+        self.values: list[Any] = values if values is not None else [''] * len(self.COLUMNS)
+
+    # --------------------------------------------------------------------------
+
+    def __delitem__(self, key: str) -> None:
+        '''Columns are fixed so may not be removed.'''
+        raise TypeError(f'Cannot remove Swift column: {key}')
+
+    # --------------------------------------------------------------------------
+
+    def __getitem__(self, key: str) -> Any:
+        '''Return the value of a column.'''
+        return self.values[self.INDEX[key]]
+
+    # --------------------------------------------------------------------------
+
+    def __iter__(self) -> Iterator[str]:
+        '''Iterate over the column names.'''
+        return iter(self.COLUMNS)
+
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        '''Return the number of columns.'''
+        return len(self.COLUMNS)
+
+    # --------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        '''Return a dict-like representation.'''
+        return f'SwiftRow({dict(zip(self.COLUMNS, self.values))})'
+
+    # --------------------------------------------------------------------------
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        '''Set the value of a column.'''
+        self.values[self.INDEX[key]] = value
+
+    # --------------------------------------------------------------------------
+
+    def copy(self) -> 'SwiftRow':
+        '''Return a shallow copy of the row.
+        Args:
+            N/A
+        Returns:
+            (SwiftRow) - copy of row
+        '''
+        return SwiftRow(self.values.copy())
+
+# ------------------------------------------------------------------------------
+
+SwiftRows: TypeAlias = list[SwiftRow]
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -0,0 +1,129 @@
+'''
+About  : Implements the TiledRegion class which splits a large region geometry
+         into quadtree tiles aligned to the British National Grid, so that each
+         region test only involves the part of the boundary near the square.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+from typing import Final
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+ROOT_SIZE: Final[int] = 100000  # side of root tiles (100km grid squares)
+MAX_DEPTH: Final[int] = 10      # deepest subdivision (tiles of c.100m side)
+
+# ------------------------------------------------------------------------------
+
+class TiledRegion:
+    '''Class which answers region tests against quadtree tiles of a region.
+       Tiles wholly inside the region need no geometric test; tiles crossing the
+       boundary hold the region clipped to the tile.'''
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, region: BaseGeometry, max_vertices: int) -> None:
+        '''Constructor. Build the tiles.
+        Args:
+            region (BaseGeometry) - region geometry (British National Grid)
+            max_vertices (int) - subdivide tiles holding more vertices than this
+        Returns:
+            N/A
+        '''
+        self.max_vertices: int = max_vertices
+        self.boxes: np.ndarray = np.empty(0, dtype=object)   # tile polygons
+        self.clips: np.ndarray = np.empty(0, dtype=object)   # region within tile
+        self.inside: np.ndarray = np.empty(0, dtype=bool)    # tile within region
+        self.tree: STRtree|None = None
+        self.build(region)
+
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        '''Return the number of tiles.'''
+        return len(self.boxes)
+
+    # --------------------------------------------------------------------------
+
+    def build(self, region: BaseGeometry) -> None:
+        '''Split the region into tiles. Each level is clipped from the tiles of
+           the level above, so the cost of clipping falls as tiles shrink.
+        Args:
+            region (BaseGeometry) - region geometry (British National Grid)
+        Returns:
+            N/A
+        '''
+        xmin, ymin, xmax, ymax = region.bounds
+        xs = np.arange(xmin // ROOT_SIZE, xmax // ROOT_SIZE + 1) * ROOT_SIZE
+        ys = np.arange(ymin // ROOT_SIZE, ymax // ROOT_SIZE + 1) * ROOT_SIZE
+        x, y = (a.ravel() for a in np.meshgrid(xs, ys))
+        parents = np.full(len(x), region, dtype=object)
+        size = float(ROOT_SIZE)
+        boxes: list[np.ndarray] = []
+        clips: list[np.ndarray] = []
+        inside: list[np.ndarray] = []
+        for depth in range(MAX_DEPTH + 1):
+            tiles = shapely.box(x, y, x + size, y + size)
+            clip = shapely.intersection(parents, tiles)
+            keep = ~shapely.is_empty(clip)
+            full = keep & shapely.covers(parents, tiles)
+            split = (keep & ~full &
+                     (shapely.get_num_coordinates(clip) > self.max_vertices))
+            if depth == MAX_DEPTH:
+                split[:] = False
+            leaf = keep & ~split
+            boxes.append(tiles[leaf])
+            clips.append(np.where(full, None, clip)[leaf])
+            inside.append(full[leaf])
+            if not split.any():
+                break
+            # Four children of each tile to be split
+            half = size / 2
+            xp, yp = x[split], y[split]
+            x = np.concatenate([xp, xp + half, xp, xp + half])
+            y = np.concatenate([yp, yp, yp + half, yp + half])
+            parents = np.tile(clip[split], 4)
+            size = half
+
+        self.boxes = np.concatenate(boxes)
+        self.clips = np.concatenate(clips)
+        self.inside = np.concatenate(inside)
+        shapely.prepare(self.clips[~self.inside])
+        self.tree = STRtree(self.boxes)
+        log.debug('Region split into %i tiles (%i inside region)',
+                  len(self.boxes), int(self.inside.sum()))
+
+    # --------------------------------------------------------------------------
+
+    def intersects(self, geoms: np.ndarray) -> np.ndarray:
+        '''Determine whether each of an array of geometries intersects the region.
+        Args:
+            geoms (numpy array of Polygon) - geometries (eastings/northings)
+        Returns:
+            (numpy array of bool) - True if geometry intersects region
+        '''
+        rv = np.zeros(len(geoms), dtype=bool)
+        ig, it = self.tree.query(geoms, predicate='intersects') # type: ignore
+        # Touching a tile wholly inside the region decides the result
+        rv[ig[self.inside[it]]] = True
+        todo = ~self.inside[it] & ~rv[ig]
+        ig, it = ig[todo], it[todo]
+        rv[ig[shapely.intersects(self.clips[it], geoms[ig])]] = True
+
+        return rv
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -4,13 +4,19 @@ About  : Utility classes and functions.
 
 # ------------------------------------------------------------------------------
 
+import bz2
+import gzip
+import io
 import logging
+import os
 import re
 import shutil
 import time
+import zipfile
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
+from typing import IO, Any, Final
 from word2number import w2n
 
 import const
@@ -19,6 +25,13 @@ import const
 
 log: logging.Logger = logging.getLogger(__name__)
 
+# Text which cannot contain a number word (see word_to_num)
+NO_LETTERS: Final[re.Pattern] = re.compile(r'[\W\d_]*')
+# Compressed input file suffixes and the functions which open them
+COMPRESSED: Final[dict[str, Any]] = {'.bz2': bz2.open, '.gz': gzip.open}
+# Path of a member of a zip archive (<archive>/<member>)
+ZIP_MEMBER: Final[re.Pattern] = re.compile(r'(.+?\.zip)[/\\](.+)', re.IGNORECASE)
+
 # ------------------------------------------------------------------------------
 
 def alpha_count(txt: str) -> int:
@@ -107,6 +120,23 @@ def is_order_insect(order: str) -> bool:
 
 # ------------------------------------------------------------------------------
 
+def list_inputs(file_path: str) -> list[str]:
+    '''Returns the CSV files held by an input file: the CSV members of a zip 
+       archive (as <archive>/<member>), else the file itself.
+    Args: 
+        file_path (string) - path to input file
+    Returns: 
+        (list of strings) - paths to CSV files (see open_input)
+    '''
+    if not file_path.lower().endswith('.zip'):
+        return [file_path]
+
+    with zipfile.ZipFile(file_path) as archive:
+        return [f'{file_path}/{info.filename}' for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith('.csv')]
+
+# ------------------------------------------------------------------------------
+
 def make_file_backup(file_path: str) -> None:
     '''Make a backup of a file.
     Args: 
@@ -123,6 +153,49 @@ def make_file_backup(file_path: str) -> None:
 
 # ------------------------------------------------------------------------------
 
+def open_input(file_path: str) -> IO[str]:
+    '''Open a CSV input file for reading as text. Compressed (.gz, .bz2) files
+       and members of zip archives (see list_inputs) are decompressed as they 
+       are read, without being extracted to disk.
+    Args: 
+        file_path (string) - path to input file
+    Returns: 
+        (text file) - open file
+    '''
+    m = ZIP_MEMBER.fullmatch(file_path)
+    if m is not None and os.path.isfile(m[1]):
+        with zipfile.ZipFile(m[1]) as archive:
+            # Member remains readable once archive is closed
+            member = archive.open(m[2])
+        return io.TextIOWrapper(member, encoding='utf-8-sig')
+
+    func = COMPRESSED.get(os.path.splitext(file_path)[1].lower())
+    if func is not None:
+        return func(file_path, mode='rt', encoding='utf-8-sig')
+
+    return open(file_path, mode='r', encoding='utf-8-sig')
+
+# ------------------------------------------------------------------------------
+
+def output_name(file_path: str) -> str:
+    '''Returns the name after which the output files of an input file are 
+       named: the filename without any compression suffix, prefixed by the 
+       archive name for a member of a zip archive (e.g. export.zip/data.csv 
+       becomes export_data.csv).
+    Args: 
+        file_path (string) - path to input file (see list_inputs)
+    Returns: 
+        (string) - filename
+    '''
+    rv = os.path.basename(strip_compression(file_path))
+    m = ZIP_MEMBER.fullmatch(file_path)
+    if m is not None:
+        rv = os.path.splitext(os.path.basename(m[1]))[0] + '_' + rv
+
+    return rv
+
+# ------------------------------------------------------------------------------
+
 def read_csv_robust(file_path: str) -> pd.DataFrame:
     '''Robustly read a CSV file, trying multiple encodings and delimiters.
     Args: 
@@ -147,6 +220,19 @@ def read_csv_robust(file_path: str) -> pd.DataFrame:
 
 # ------------------------------------------------------------------------------
 
+def strip_compression(file_path: str) -> str:
+    '''Returns the path of an input file without any compression suffix (e.g.
+       data.csv.gz becomes data.csv).
+    Args: 
+        file_path (string) - path to input file
+    Returns: 
+        (string) - path without compression suffix
+    '''
+    stem, ext = os.path.splitext(file_path)
+    return stem if ext.lower() in COMPRESSED else file_path
+
+# ------------------------------------------------------------------------------
+
 def strip_string(txt: str) -> str:
     '''Returns string having removed non-letter chars and multiple spaces..
     Args: 
@@ -167,6 +253,11 @@ def word_to_num(txt: str) -> int|None:
     Returns: 
         (int|None) - converted value
     '''
+    # Fast paths for the common cases of digits only and no words at all
+    if txt.isascii() and txt.isdigit():
+        return int(txt)
+    if NO_LETTERS.fullmatch(txt) is not None:
+        return None
     try:
         rv = int(w2n.word_to_num(txt))
     except ValueError:
@@ -0,0 +1,145 @@
+'''
+About  : Implements the VerdictStore class which persists gridref region test
+         results between runs in an SQLite database. The database is keyed by
+         a fingerprint of the region shapefile and is emptied when it changes.
+'''
+
+# ------------------------------------------------------------------------------
+
+import logging
+import os
+import sqlite3
+from typing import Final
+
+# ------------------------------------------------------------------------------
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------
+
+# Filename suffix of the verdict store (stored next to the shapefile)
+SUFFIX: Final[str] = '.verdicts.sqlite'
+
+# ------------------------------------------------------------------------------
+
+def get_filename(fn_gis: str) -> str:
+    '''Return the verdict store filename associated with a GIS shapefile.
+    Args:
+        fn_gis (string) - path to GIS shapefile
+    Returns:
+        (string) - path to verdict store
+    '''
+    return os.path.splitext(fn_gis)[0] + SUFFIX
+
+# ------------------------------------------------------------------------------
+
+class VerdictStore:
+    '''Class which stores region test results of normalised gridrefs.'''
+
+    BATCH: Final[int] = 500     # max. gridrefs per lookup query
+
+    # --------------------------------------------------------------------------
+
+    def __init__(self, fn: str, key: str) -> None:
+        '''Constructor. Open the store, emptying it if it was written for a
+           different version of the shapefile.
+        Args:
+            fn (string) - path to verdict store
+            key (string) - fingerprint of shapefile
+        Returns:
+            N/A
+        '''
+        self.fn: str = fn
+        self.pending: dict[str, bool] = {}  # verdicts not yet written
+        self.conn: sqlite3.Connection = sqlite3.connect(fn)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS meta '
+                              '(name TEXT PRIMARY KEY, value TEXT)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS verdicts '
+                              '(gridref TEXT PRIMARY KEY, inside INTEGER) '
+                              'WITHOUT ROWID')
+            row = self.conn.execute("SELECT value FROM meta WHERE name = "
+                                    "'fingerprint'").fetchone()
+            if row is None or row[0] != key:
+                if row is not None:
+                    log.info('GIS file has changed - clearing verdict store: %s', fn)
+                self.conn.execute('DELETE FROM verdicts')
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES "
+                                  "('fingerprint', ?)", (key,))
+        log.debug('Verdict store %s holds %i gridrefs', fn, len(self))
+
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        '''Return the number of stored gridrefs (excluding those pending).'''
+        return self.conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+    # --------------------------------------------------------------------------
+
+    def add(self, gridref: str, inside: bool) -> None:
+        '''Add a verdict, to be written by the next flush.
+        Args:
+            gridref (string) - normalised grid reference
+            inside (bool) - True if gridref within region
+        Returns:
+            N/A
+        '''
+        self.pending[gridref] = inside
+
+    # --------------------------------------------------------------------------
+
+    def close(self) -> None:
+        '''Write any pending verdicts and close the store.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        self.flush()
+        self.conn.close()
+
+    # --------------------------------------------------------------------------
+
+    def flush(self) -> None:
+        '''Write pending verdicts in a single transaction. The verdicts are
+           discarded if the store cannot be written.
+        Args:
+            N/A
+        Returns:
+            N/A
+        '''
+        if len(self.pending) == 0:
+            return
+        log.debug('Writing %i gridrefs to verdict store', len(self.pending))
+        try:
+            with self.conn:
+                self.conn.executemany('INSERT OR REPLACE INTO verdicts VALUES (?, ?)',
+                                      ((k, int(v)) for k, v in self.pending.items()))
+        except sqlite3.Error as ex:
+            log.warning('Could not write verdict store (%s): %s', ex, self.fn)
+        self.pending.clear()
+
+    # --------------------------------------------------------------------------
+
+    def lookup(self, gridrefs: list[str]) -> dict[str, bool]:
+        '''Look up the stored verdicts of a list of gridrefs.
+        Args:
+            gridrefs (list of strings) - normalised grid references
+        Returns:
+            (dict) - verdict of each gridref found in the store
+        '''
+        rv: dict[str, bool] = {}
+        for i in range(0, len(gridrefs), self.BATCH):
+            batch = gridrefs[i:i + self.BATCH]
+            sql = ('SELECT gridref, inside FROM verdicts WHERE gridref IN '
+                   f'({",".join("?" * len(batch))})')
+            rv.update((k, bool(v)) for k, v in self.conn.execute(sql, batch))
+        rv.update((k, self.pending[k]) for k in gridrefs if k in self.pending)
+
+        return rv
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
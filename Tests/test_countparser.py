@@ -0,0 +1,48 @@
+'''
+About  : Tests the countparser.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+from countparser import CountParser
+
+# ------------------------------------------------------------------------------
+
+def test_parse():
+
+    cp = CountParser(100)
+    assert cp.parse(' 12 ') == ('12', None, False)
+    assert cp.parse('6-20') == ('6-20', None, False)
+    assert cp.parse('one male') == ('1', None, False)
+    assert cp.parse('3 males, 2 females') == (
+        '3 males, 2 females', (('3', '', 'male'), ('2', '', 'female')), False)
+    assert cp.parse('c50 (adults)') == ('c50 (adults)', (('c50', 'Adult', ''),), False)
+    assert cp.parse('Mixed') == ('Mixed', (), False)
+    # Repeated values are not parsed again
+    assert cp.parse('6-20') == ('6-20', None, False)
+    assert (cp.parsed.misses, cp.parsed.hits) == (6, 1)
+    # Only the most recently seen values are remembered
+    cp = CountParser(2)
+    for count in ('1', '2', '3', '1'):
+        cp.parse(count)
+    assert (len(cp.parsed.cache), cp.parsed.misses, cp.parsed.evictions) == (2, 4, 2)
+
+# ------------------------------------------------------------------------------
+
+def test_abundance():
+
+    cp = CountParser(100)
+    assert cp.get_abundance('Two') == '2'
+    assert cp.get_abundance('02') == '2'
+    assert cp.get_abundance('6-20') == '6-20'
+    assert cp.get_abundance('Mixed') == 'mixed'
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
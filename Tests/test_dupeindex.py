@@ -0,0 +1,32 @@
+'''
+About  : Tests the dupeindex.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+from dupeindex import DupeIndex
+
+# ------------------------------------------------------------------------------
+
+def test_matches_dict():
+
+    index = DupeIndex(4)
+    expected: dict[tuple, int] = {}
+    for key in range(1, 5001):
+        values = (f'taxon {key % 1777}', '01/01/2024', f'site {key % 3}')
+        assert index.get(values) == expected.get(values)
+        assert index.setdefault(values, key) == expected.setdefault(values, key)
+    # Table has grown from its initial 4 slots
+    assert len(index) == len(expected)
+    assert len(index.keys) >= len(index) / DupeIndex.MAX_LOAD
+    assert 0 < index.collision_risk() < 1e-30
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
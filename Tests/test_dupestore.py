@@ -0,0 +1,92 @@
+'''
+About  : Tests the dupestore.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import csv
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+import const
+from configmgr import ConfigMgr
+from crosscheck import Crosschecker
+from dupestore import DupeStore
+from recordparser import RecordParser
+from rules import Rules
+from skipengine import SkipEngine
+from utils_tests import INI_FILE
+
+# ------------------------------------------------------------------------------
+
+def test_across_files(tmp_path):
+
+    cc = Crosschecker(ConfigMgr(INI_FILE))
+    with open('Tests/Data_In/test_data.csv', encoding='utf-8-sig') as f:
+        records = [dict(rec, **{const.I_KEY: ix + 1})
+                   for ix, rec in enumerate(csv.DictReader(f))]
+    rules = Rules(cc)
+    results = []
+    for rec in records:
+        rules.set_record(rec)
+        results.append(rules.get_swift())
+    # ----------------------------------------------------------------------
+    def dedupe(store: DupeStore, fn: str, columnar: bool) -> list[str]:
+        '''De-dupe the records as if read from the given file.'''
+        store.set_file(fn)
+        if columnar:
+            mask, note = SkipEngine(cc, store).skip_duplicate(results)
+            rv = note.where(mask, '').tolist()
+        else:
+            rv = [rules.is_skip_duplicate(res, store)[1] for res in results]
+        store.flush()
+        return rv
+    # ----------------------------------------------------------------------
+
+    for columnar in (False, True):
+        store = DupeStore(str(tmp_path / f'dupes{columnar}.sqlite'))
+        first = dedupe(store, 'Data_In/a.csv', columnar)
+        assert 0 < sum(len(n) > 0 for n in first) < len(first)
+        assert all('a.csv' not in n for n in first)
+        # Every record of a second file duplicates a record of the first
+        second = dedupe(store, 'b.csv', columnar)
+        fn = os.path.abspath('Data_In/a.csv')
+        assert all(n.startswith(f'[Duplicate: "{fn}: ') for n in second)
+        # Files of the same name in another folder or archive are kept apart
+        for other in ('Data_Out/a.csv', 'Data_In/a.zip/a.csv'):
+            assert dedupe(store, other, columnar) == second
+        # Re-processing a file replaces its records
+        assert dedupe(store, 'Data_In/a.csv', columnar) == first
+        assert len(store) == len(first) - sum(len(n) > 0 for n in first)
+        store.close()
+        if columnar:
+            assert (first, second) == expected
+        expected = (first, second)
+
+# ------------------------------------------------------------------------------
+
+def test_reopen_store(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+    config.dir_data_out = str(tmp_path)
+    config.excel = False
+    config.file_processed = ''
+    config.dupe_store = str(tmp_path / 'dupes.sqlite')
+    rp = RecordParser(config)
+    for name in ('a.csv', 'b.csv'):
+        shutil.copy('Tests/Data_In/test_data.csv', tmp_path / name)
+    assert rp.read_file(str(tmp_path / 'a.csv')) is True
+    rp.close()
+    # A closed store is re-opened, so every record of a later file is a
+    # duplicate of one already stored
+    assert rp.read_file(str(tmp_path / 'b.csv')) is True
+    assert rp.totals['swift'] == 0
+    rp.close()
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
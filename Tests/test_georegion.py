@@ -3,13 +3,21 @@ About  : Tests the georegion.py module.
 '''
 # ------------------------------------------------------------------------------
 
+import json
 import os
+import shutil
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
 
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+from compiledregion import CompiledRegion
 from configmgr import ConfigMgr
 from georegion import GeoRegion
+import regioncache
 from utils_tests import INI_FILE
 
 # ------------------------------------------------------------------------------
@@ -46,6 +54,286 @@ def test_point_in_poly():
 
 # ------------------------------------------------------------------------------
 
+def test_gridrefs_in_region():
+
+    config = ConfigMgr(INI_FILE)
+
+    geo = GeoRegion(config)
+    gridrefs = ['SJ403661', 'SH874544', 'SJ78', 'SJ40696678', 'SP450440']
+    inside = geo.gridrefs_in_region(gridrefs)
+
+    assert inside.tolist() == [True, False, True, True, False]
+
+    geo.load_table(gridrefs)
+    verdicts = [geo.gridref_in_region(gr) for gr in gridrefs]
+
+    assert verdicts == inside.tolist()
+    assert geo.count() == (2, 2)
+    assert geo.table_hits == len(gridrefs)
+    assert geo.cache_misses == 0
+    assert len(geo.gridrefs_in_region([])) == 0
+
+# ------------------------------------------------------------------------------
+
+def test_points_in_region():
+
+    config = ConfigMgr(INI_FILE)
+    config.region_points = True
+
+    geo = GeoRegion(config)
+    # Record coordinates at centre of gridref square, except for the last
+    gridrefs = ['SJ7070', 'SJ403661', 'SH874544', 'SP450440', 'SJ7070']
+    squares = np.array(geo.gridrefs_to_squares(gridrefs))
+    centres = squares[:, :2] + squares[:, 2:] / 2
+    centres[-1] = centres[2]
+    to_wgs84 = Transformer.from_crs(geo.crs, 'EPSG:4326', always_xy=True)
+    lon, lat = to_wgs84.transform(centres[:, 0], centres[:, 1])
+    coords = ([str(v) for v in lat], [str(v) for v in lon], ['10'] * 5)
+    rv = geo.points_in_region(squares, *coords)
+
+    assert rv.tolist() == [1, 1, 0, 0, -1]
+
+    geo.load_table(gridrefs, coords)
+    table = dict(geo.table)
+    geo.load_table(gridrefs)
+
+    assert table == geo.table
+
+# ------------------------------------------------------------------------------
+
+def test_prepared_region():
+
+    config = ConfigMgr(INI_FILE)
+    config.region_prepared = True
+
+    geo = GeoRegion(config)
+    gridrefs = [('SJ403661', True),
+                ('SJ40696678', True),
+                ('SJ100500', False),
+                ('SJ7070', True),
+                ('SH874544', False),
+                ('SP36593729', False)]
+    verdicts = [geo.gridref_in_region(gr[0]) for gr in gridrefs]
+    inside = geo.gridrefs_in_region([gr[0] for gr in gridrefs])
+
+    assert geo.core_prep is not None
+    assert verdicts == [gr[1] for gr in gridrefs]
+    assert inside.tolist() == verdicts
+
+# ------------------------------------------------------------------------------
+
+def test_tiled_region():
+
+    config = ConfigMgr(INI_FILE)
+    config.region_tiled = True
+    config.region_tile_vertices = 64
+
+    geo = GeoRegion(config)
+    gridrefs = [('SJ403661', True),
+                ('SJ40696678', True),
+                ('SJ100500', False),
+                ('SJ7070', True),
+                ('SH874544', False),
+                ('SP36593729', False)]
+    verdicts = [geo.gridref_in_region(gr[0]) for gr in gridrefs]
+    inside = geo.gridrefs_in_region([gr[0] for gr in gridrefs])
+
+    assert len(geo.tiles) > 1
+    assert geo.tiles.inside.any()
+    assert verdicts == [gr[1] for gr in gridrefs]
+    assert inside.tolist() == verdicts
+
+# ------------------------------------------------------------------------------
+
+def test_compiled_region(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+
+    geo = GeoRegion(config)
+    fn = str(tmp_path / 'region.npz')
+    CompiledRegion.compile(shapely.union_all(geo.gs_region.values), geo.crs, fn,
+                           '')
+    gridrefs = ['SJ403661', 'SJ40696678', 'SJ41756640', 'SH874544', 'SP450440',
+                'SJ100500', 'SJ7070', 'SJ40', 'SJ4066', 'SJ2566', 'SJ78']
+    inside = geo.gridrefs_in_region(gridrefs)
+
+    geo_c = GeoRegion(config)
+    geo_c.load_compiled(CompiledRegion(fn))
+    verdicts = [geo_c.classify_gridref(gr)[0] for gr in gridrefs]
+
+    assert verdicts == inside.tolist()
+    assert geo_c.gridrefs_in_region(gridrefs).tolist() == inside.tolist()
+
+# ------------------------------------------------------------------------------
+
+def test_vcs_in_region():
+
+    config = ConfigMgr(INI_FILE)
+    config.region_vcs = ('58',)
+
+    geo = GeoRegion(config)
+    gridrefs = ['SJ40696678', 'SJ40696678', 'SP450440', 'SP450440', 'SJ5045']
+    vcs = ['58', '59', '31', '', '58']
+    precision = ['100', '100', '100', '100', '1000']
+    inside = GeoRegion(ConfigMgr(INI_FILE)).gridrefs_in_region(gridrefs)
+
+    squares = np.array(geo.gridrefs_to_squares(gridrefs))
+    rv = geo.vcs_in_region(squares, vcs, precision)
+    # SJ5045 lies within 1km of the boundary
+    assert rv.tolist() == [1, -1, 0, -1, -1]
+
+    geo.load_table(gridrefs[::2], vcs=(vcs[::2], precision[::2]))
+    assert [geo.gridref_in_region(gr) for gr in gridrefs] == inside.tolist()
+
+# ------------------------------------------------------------------------------
+
+def test_named_regions(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+    geo = GeoRegion(config)
+    # Split region into western and eastern halves either side of SJ 60 00
+    region = shapely.union_all(geo.gs_region.values)
+    _, ymin, _, ymax = region.bounds
+    west = region.intersection(shapely.box(0, ymin, 360000, ymax))
+    east = region.intersection(shapely.box(360000, ymin, 700000, ymax))
+    gdf = geo.gdf_region.iloc[[0, 0]].copy()
+    gdf['name'] = ['West', 'East']
+    gdf['geometry'] = [west, east]
+    config.file_gis = str(tmp_path / 'named.shp')
+    gdf.to_file(config.file_gis)
+    config.region_field = 'name'
+
+    geo = GeoRegion(config)
+    gridrefs = ['SJ403661', 'SJ7070', 'SJ6070', 'SJ', 'SH874544', 'SJ78']
+    routes = geo.gridrefs_regions(gridrefs)
+
+    assert geo.names == ['East', 'West']
+    assert routes == [('West',), ('East',), ('East', 'West'), (), (), ('East',)]
+
+    geo.load_table(gridrefs)
+    assert [geo.gridref_regions(gr) for gr in gridrefs] == routes
+
+# ------------------------------------------------------------------------------
+
+def test_verdict_store(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+    stem = os.path.splitext(config.file_gis)[0]
+    for ext in regioncache.EXTENSIONS:
+        if os.path.isfile(stem + ext):
+            shutil.copy(stem + ext, tmp_path)
+    config.file_gis = str(tmp_path / os.path.basename(config.file_gis))
+    config.region_verdict_store = True
+    gridrefs = ['SJ403661', 'SH874544', 'SJ78', 'SJ40696678', 'SP450440']
+
+    geo = GeoRegion(config)
+    geo.load_table(gridrefs[:2])
+    verdicts = [geo.gridref_in_region(gr) for gr in gridrefs]
+    geo.save_verdicts()
+
+    assert len(geo.store) == 4
+    assert verdicts == [True, False, True, True, False]
+
+    # Stored verdicts are used in place of geometry by a later run
+    def no_geometry(*_):
+        raise AssertionError('Geometry test performed')
+    geo = GeoRegion(config)
+    geo.squares_in_region = no_geometry
+    geo.load_table(gridrefs)
+    assert [geo.gridref_in_region(gr) for gr in gridrefs] == verdicts
+    geo.reset()
+    geo.square_in_region = no_geometry
+    assert [geo.gridref_in_region(gr) for gr in gridrefs] == verdicts
+    assert geo.count() == (2, 2)
+
+    # Any change to the shapefile empties the store
+    fn_prj = os.path.splitext(config.file_gis)[0] + '.prj'
+    os.utime(fn_prj, ns=(0, 0))
+    geo = GeoRegion(config)
+    assert len(geo.store) == 0
+
+    # The region is still loaded if the store cannot be opened
+    fn_store = geo.store.fn
+    geo.store.close()
+    os.remove(fn_store)
+    os.mkdir(fn_store)
+    geo = GeoRegion(config)
+    assert geo.store is None
+    geo.load_table(gridrefs)
+    assert [geo.gridref_in_region(gr) for gr in gridrefs] == verdicts
+
+# ------------------------------------------------------------------------------
+
+def test_plot_headless(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+    config.plot = True
+    config.plot_headless = True
+    config.dir_data_out = str(tmp_path)
+
+    geo = GeoRegion(config)
+    for gr in ['SJ403661', 'SH874544', 'SP450440', 'SH874544']:
+        geo.gridref_in_region(gr)
+    geo.plot('Data_In/test.csv')
+
+    assert os.path.isfile(tmp_path / 'test_outside.png')
+    with open(tmp_path / 'test_outside.geojson', encoding='utf-8') as f:
+        features = json.load(f)['features']
+    assert sorted(ft['properties']['count'] for ft in features) == [1, 2]
+
+# ------------------------------------------------------------------------------
+
+def test_gridref_cache():
+
+    config = ConfigMgr(INI_FILE)
+    config.region_cache_size = 2
+
+    geo = GeoRegion(config)
+    gridrefs = ['SJ403661', 'sj403661', 'SH874544', 'SJ403661', 'SP450440',
+                'SH874544']
+    verdicts = [geo.gridref_in_region(gr) for gr in gridrefs]
+
+    assert verdicts == [True, True, False, True, False, False]
+    assert geo.count() == (3, 3)
+    assert (len(geo.inside), len(geo.outside)) == (1, 2)
+    assert (geo.cache_hits, geo.cache_misses, geo.cache_evictions) == (2, 4, 2)
+
+# ------------------------------------------------------------------------------
+
+def test_geometry_cache(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+    stem = os.path.splitext(config.file_gis)[0]
+    for ext in regioncache.EXTENSIONS:
+        if os.path.isfile(stem + ext):
+            shutil.copy(stem + ext, tmp_path)
+    config.file_gis = str(tmp_path / os.path.basename(config.file_gis))
+    config.region_geometry_cache = True
+    gridrefs = ['SJ403661', 'SH874544', 'SJ78', 'SJ40696678', 'SP450440']
+
+    geo = GeoRegion(config)
+    assert geo.gdf_region is not None
+    assert os.path.isfile(regioncache.get_filename(config.file_gis))
+    inside = geo.gridrefs_in_region(gridrefs).tolist()
+
+    geo_c = GeoRegion(config)
+    assert geo_c.gdf_region is None
+    assert geo_c.gridrefs_in_region(gridrefs).tolist() == inside
+
+    # Any change to the shapefile invalidates the cache
+    fn_prj = os.path.splitext(config.file_gis)[0] + '.prj'
+    os.utime(fn_prj, ns=(0, 0))
+    geo_r = GeoRegion(config)
+    assert geo_r.gdf_region is not None
+
+    # The region is still loaded if the cache cannot be written
+    os.remove(regioncache.get_filename(config.file_gis))
+    os.mkdir(regioncache.get_filename(config.file_gis))
+    geo_w = GeoRegion(config)
+    assert geo_w.gridrefs_in_region(gridrefs).tolist() == inside
+
+# ------------------------------------------------------------------------------
+
 '''
 End
 '''
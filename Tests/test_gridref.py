@@ -0,0 +1,41 @@
+'''
+About  : Tests the gridref.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+from gridref import decode
+
+# ------------------------------------------------------------------------------
+
+def test_decode():
+
+    gridrefs = [('SJ78', (370000, 380000, 10000)),
+                ('SJ4066', (340000, 366000, 1000)),
+                ('sj 403 661', (340300, 366100, 100)),
+                ('SJ40696678', (340690, 366780, 10)),
+                ('NT2755072950', (327550, 672950, 1)),
+                ('SJ45Q', (346000, 350000, 2000)),
+                ('SJ45O', None),
+                ('SJ403', None),
+                ('SI4066', None),
+                ('WGS84', None),
+                ('', None)]
+    e, n, size, valid = decode([gr[0] for gr in gridrefs])
+
+    for i, gr in enumerate(gridrefs):
+        square = (e[i], n[i], size[i]) if valid[i] else None
+        assert square == gr[1], gr[0]
+
+    e, n, size, valid = decode([])
+    assert len(e) == len(n) == len(size) == len(valid) == 0
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
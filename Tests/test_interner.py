@@ -0,0 +1,44 @@
+'''
+About  : Tests the interner.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import csv
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+import const
+from interner import Interner
+
+# ------------------------------------------------------------------------------
+
+def test_intern():
+
+    with open('Tests/Data_In/test_data.csv', encoding='utf-8-sig') as f:
+        records = list(csv.DictReader(f))
+    expected = [dict(rec) for rec in records]
+    interner = Interner()
+    for rec in records:
+        interner.intern(rec)
+    # Values are unchanged, but each distinct value is now a single instance
+    assert records == expected
+    sources = {id(rec[const.I_SOURCE]) for rec in records}
+    assert len(sources) == len({rec[const.I_SOURCE] for rec in records})
+    assert const.I_RECORDKEY not in interner.tables
+    # Values of a frame share the instances of the values already interned
+    df = pd.DataFrame(expected, dtype=object)
+    values = dict(zip(df.columns, interner.intern_frame(df)))
+    assert values[const.I_SOURCE] == df[const.I_SOURCE].tolist()
+    assert values[const.I_SOURCE][0] is records[0][const.I_SOURCE]
+    interner.reset()
+    assert all(len(table) == 0 for table in interner.tables.values())
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
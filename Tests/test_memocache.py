@@ -0,0 +1,39 @@
+'''
+About  : Tests the memocache.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+from memocache import MemoCache
+
+# ------------------------------------------------------------------------------
+
+def test_memo_cache():
+
+    calls = []
+    def func(a: str, b: str) -> str:
+        calls.append((a, b))
+        return a + b
+
+    memo = MemoCache('Test', func, 2)
+    assert [memo('a', '1'), memo('b', '1'), memo('a', '1')] == ['a1', 'b1', 'a1']
+    # Least recently used result is evicted
+    assert memo('c', '1') == 'c1'
+    assert memo('b', '1') == 'b1'
+    assert calls == [('a', '1'), ('b', '1'), ('c', '1'), ('b', '1')]
+    assert (memo.hits, memo.misses, memo.evictions) == (1, 4, 2)
+    # Size of 0 disables caching
+    memo = MemoCache('Test', func, 0)
+    memo('a', '1')
+    memo('a', '1')
+    assert (memo.hits, memo.misses, len(memo.cache)) == (0, 2, 0)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
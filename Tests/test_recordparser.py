@@ -3,17 +3,158 @@ About  : Tests the recordparser.py module.
 '''
 # ------------------------------------------------------------------------------
 
+import bz2
+import csv
+import filecmp
+import gzip
 import os
+import shutil
+import zipfile
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
 
+import pytest
+
+import const
 from configmgr import ConfigMgr
+from controller import RecordController
 from recordparser import RecordParser
 from utils_tests import INI_FILE
 
 # ------------------------------------------------------------------------------
 
+def test_compressed_files(tmp_path):
+
+    fn = 'Tests/Data_In/test_data.csv'
+    folder = tmp_path / 'Data_In'
+    folder.mkdir()
+    with open(fn, 'rb') as f:
+        data = f.read()
+    with gzip.open(folder / 'test_gz.csv.gz', 'wb') as f:
+        f.write(data)
+    with bz2.open(folder / 'test_bz2.csv.bz2', 'wb') as f:
+        f.write(data)
+    with zipfile.ZipFile(folder / 'test.zip', 'w', zipfile.ZIP_DEFLATED) as z:
+        z.write(fn, 'test_zip1.csv')
+        z.write(fn, 'Export/test_zip2.csv')
+        z.writestr('README.txt', 'Not a CSV file')
+    files = sorted(RecordController(INI_FILE).get_files(str(folder)),
+                   key=os.path.basename)
+    assert [os.path.basename(f) for f in files] == [
+        'test_bz2.csv.bz2', 'test_gz.csv.gz', 'test_zip1.csv', 'test_zip2.csv']
+    # Each compressed file gives the same results as the uncompressed file
+    config = ConfigMgr(INI_FILE)
+    config.dir_data_out = str(tmp_path)
+    config.excel = False
+    config.file_processed = ''
+    rp = RecordParser(config)
+    for f in [fn] + files:
+        assert rp.read_file(f) is True
+    # Outputs of zip members are also named after the archive
+    for name in ('test_bz2', 'test_gz', 'test_test_zip1', 'test_test_zip2'):
+        for suffix in ('_key', '_skip', '_swift', '_processed'):
+            assert filecmp.cmp(tmp_path / f'test_data{suffix}.csv',
+                               tmp_path / f'{name}{suffix}.csv', shallow=False)
+
+# ------------------------------------------------------------------------------
+
+def test_output_names(tmp_path):
+
+    fn = 'Tests/Data_In/test_data.csv'
+    files = []
+    for folder in ('a', 'b'):
+        os.mkdir(tmp_path / folder)
+        shutil.copy(fn, tmp_path / folder / 'export.csv')
+        with zipfile.ZipFile(tmp_path / folder / f'{folder}.zip', 'w') as z:
+            z.write(fn, 'export.csv')
+        files += [str(tmp_path / folder / 'export.csv'),
+                  str(tmp_path / folder / f'{folder}.zip' / 'export.csv')]
+    config = ConfigMgr(INI_FILE)
+    config.dir_data_out = str(tmp_path)
+    config.excel = False
+    config.file_processed = ''
+    rp = RecordParser(config)
+    # Files of the same name in different archives are written separately,
+    # but those in different folders would overwrite each other so are refused
+    assert [rp.read_file(f) for f in files] == [True, True, False, True]
+    assert rp.read_file(files[0]) is True
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith('_swift.csv')) == [
+        'a_export_swift.csv', 'b_export_swift.csv', 'export_swift.csv']
+
+# ------------------------------------------------------------------------------
+
+def test_csv_engine(tmp_path):
+
+    # Add an unused column and a multi-line value to the test data
+    with open('Tests/Data_In/test_data.csv', encoding='utf-8-sig') as f:
+        rows = [row + ['Unused'] for row in csv.reader(f)]
+    rows[1][rows[0].index(const.I_COMMENT)] = 'Two\nlines, "quoted"'
+    fn = tmp_path / 'test_data.csv'
+    with open(fn, 'w', encoding='utf-8-sig', newline='') as f:
+        csv.writer(f).writerows(rows)
+    records = []
+    for engine in (const.CSV_ENGINE_PYTHON, const.CSV_ENGINE_C):
+        config = ConfigMgr(INI_FILE)
+        config.csv_engine = engine
+        rp = RecordParser(config)
+        with open(fn, encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            assert rp.check_header(list(reader.fieldnames or [])) is True
+            records.append([rec for chunk in rp.read_records(f, reader, 1000)
+                            for rec in chunk])
+    # Both engines give the same records, holding only the expected columns
+    assert records[0] == records[1]
+    assert len(records[0]) == len(rows) - 1
+    assert sorted(records[0][0]) == sorted(const.I_COLUMNS)
+    assert records[1][0][const.I_COMMENT] == 'Two\nlines, "quoted"'
+
+# ------------------------------------------------------------------------------
+
+def test_failed_file(tmp_path):
+
+    config = ConfigMgr(INI_FILE)
+    config.dir_data_out = str(tmp_path)
+    config.excel = False
+    config.file_processed = ''
+    config.stream_chunk = 1000
+    rp = RecordParser(config)
+    write_results = rp.write_results
+    files = []
+    # ----------------------------------------------------------------------
+    def fail(records):
+        '''Write the first chunk, then fail.'''
+        if len(rp.outputs) > 0:
+            raise RuntimeError('Failed')
+        write_results(records)
+        files.extend(f for f, _ in rp.outputs.values())
+    # ----------------------------------------------------------------------
+    rp.write_results = fail
+    with pytest.raises(RuntimeError):
+        rp.read_file('Tests/Data_In/test_data.csv')
+    # Output files are closed even if processing fails
+    assert len(files) > 0 and all(f.closed for f in files)
+    assert len(rp.outputs) == 0
+
+# ------------------------------------------------------------------------------
+
+def test_header_only_file(tmp_path):
+
+    with open('Tests/Data_In/test_data.csv', encoding='utf-8-sig') as f:
+        header = f.readline()
+    fn = tmp_path / 'test_empty.csv'
+    with open(fn, 'w', encoding='utf-8-sig') as f:
+        f.write(header)
+    for engine in (const.CSV_ENGINE_PYTHON, const.CSV_ENGINE_C):
+        config = ConfigMgr(INI_FILE)
+        config.dir_data_out = str(tmp_path)
+        config.excel = False
+        config.file_processed = ''
+        config.csv_engine = engine
+        assert RecordParser(config).read_file(str(fn)) is True
+
+# ------------------------------------------------------------------------------
+
 def test_parse_record_file():
 
     config = ConfigMgr(INI_FILE)
@@ -24,6 +165,29 @@ def test_parse_record_file():
 
 # ------------------------------------------------------------------------------
 
+def test_stream_file(tmp_path):
+
+    fn = 'Tests/Data_In/test_data.csv'
+    outputs = []
+    for chunk in (0, 1000):
+        config = ConfigMgr(INI_FILE)
+        config.dir_data_out = str(tmp_path / str(chunk))
+        config.excel = False
+        config.file_processed = ''
+        config.stream_chunk = chunk
+        os.mkdir(config.dir_data_out)
+        rp = RecordParser(config)
+        assert rp.read_file(fn) is True
+        outputs.append(config.dir_data_out)
+    # Streamed results are the same as those of the whole file
+    files = sorted(os.listdir(outputs[0]))
+    assert len(files) == 4
+    assert files == sorted(os.listdir(outputs[1]))
+    _, mismatch, errors = filecmp.cmpfiles(*outputs, files, shallow=False)
+    assert mismatch == errors == []
+
+# ------------------------------------------------------------------------------
+
 '''
 End
 '''
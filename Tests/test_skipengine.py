@@ -0,0 +1,84 @@
+'''
+About  : Tests the skipengine.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import csv
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+import const
+from configmgr import ConfigMgr
+from crosscheck import Crosschecker
+from rules import DupeDict, Rules
+from skipengine import SkipEngine
+from utils_tests import INI_FILE
+
+# ------------------------------------------------------------------------------
+
+def compare_rules(fast_reject: str) -> tuple[list[str], tuple[int, int]]:
+    '''Compare the results of SkipEngine and Rules.is_skip for the test data.
+    Args: 
+        fast_reject (string) - fast reject mode
+    Returns: 
+        (list of strings, (int, int)) - skip types, inside/outside counts
+    '''
+    config = ConfigMgr(INI_FILE)
+    config.fast_reject = fast_reject
+    cc = Crosschecker(config)
+    with open('Tests/Data_In/test_data.csv', encoding='utf-8-sig') as f:
+        records = [dict(rec, **{const.I_KEY: ix + 1})
+                   for ix, rec in enumerate(csv.DictReader(f))]
+    rules = Rules(cc)
+    results = []
+    for rec in records:
+        rules.set_record(rec)
+        results.append(rules.get_swift())
+    # Test each record in turn
+    dupechecks: DupeDict = dict()
+    expected = []
+    for rec, res in zip(records, results):
+        rules.set_record(rec)
+        expected.append(rules.is_skip(res, dupechecks))
+    expected_count = cc.georegion.count()
+    # Test all records at once
+    cc.georegion.reset()
+    itypes, inotes = SkipEngine(cc).is_skip(records, results)
+
+    assert list(zip(itypes, inotes)) == expected
+    assert any(len(t) > 0 for t in itypes)
+    assert cc.georegion.count() == expected_count
+    # Results of the cheap tests may be computed beforehand
+    engine = SkipEngine(cc)
+    cheap = engine.skip_cheap(engine.get_frame(records))
+    assert engine.is_skip(records, results, cheap) == (itypes, inotes)
+
+    return itypes, expected_count
+
+# ------------------------------------------------------------------------------
+
+def test_matches_rules():
+
+    compare_rules(const.FAST_REJECT_OFF)
+
+# ------------------------------------------------------------------------------
+
+def test_fast_reject():
+
+    types, count = compare_rules(const.FAST_REJECT_OFF)
+    types_first, count_first = compare_rules(const.FAST_REJECT_FIRST)
+    types_cheap, count_cheap = compare_rules(const.FAST_REJECT_CHEAP)
+    # The same records are skipped, with fewer reasons and region tests
+    assert [len(t) > 0 for t in types_first] == [len(t) > 0 for t in types]
+    assert [len(t) > 0 for t in types_cheap] == [len(t) > 0 for t in types]
+    assert all(';' not in t for t in types_first)
+    assert any(';' in t for t in types_cheap)
+    assert sum(count_first) == sum(count_cheap) < sum(count)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -0,0 +1,33 @@
+'''
+About  : Tests the squarestore.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+from squarestore import SquareStore
+
+# ------------------------------------------------------------------------------
+
+def test_square_store():
+
+    store = SquareStore()
+    squares = [(340000 + 100 * i, 366000, 100) for i in range(3000)]
+    for sq in squares + squares[:10]:
+        store.add(sq)
+
+    sq, counts = store.arrays()
+    assert (len(store), store.total) == (3000, 3010)
+    assert tuple(sq[5]) == squares[5] and counts[5] == 2 and counts[10] == 1
+
+    store.clear()
+    assert (len(store), store.total) == (0, 0)
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
@@ -0,0 +1,60 @@
+'''
+About  : Tests the swiftbuilder.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import csv
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+import const
+from configmgr import ConfigMgr
+from crosscheck import Crosschecker
+from rules import Rules
+from swiftbuilder import SwiftBuilder
+from utils_tests import INI_FILE
+
+# ------------------------------------------------------------------------------
+
+def test_matches_rules():
+
+    config = ConfigMgr(INI_FILE)
+    rules = Rules(Crosschecker(config))
+    with open('Tests/Data_In/test_data.csv', encoding='utf-8-sig') as f:
+        records = [dict(rec, **{const.I_KEY: ix + 1})
+                   for ix, rec in enumerate(csv.DictReader(f))]
+    # Create the Swift records of each record in turn
+    expected = []
+    for rec in records:
+        rules.set_record(rec)
+        expected.append([row.values for row in rules.get_swift()])
+    # Create the Swift records of all records at once
+    results = SwiftBuilder(rules).build(records)
+
+    assert [[row.values for row in res] for res in results] == expected
+    assert any(len(res) > 1 for res in results)
+
+# ------------------------------------------------------------------------------
+
+def test_map_unique():
+
+    calls = []
+    def func(a: str, b: str) -> str:
+        calls.append((a, b))
+        return a + b
+
+    rv = SwiftBuilder.map_unique(func, pd.Series(['x', 'y', 'x', 'x']),
+                                 pd.Series(['1', '1', '1', '2']))
+
+    assert rv.tolist() == ['x1', 'y1', 'x1', 'x2']
+    assert calls == [('x', '1'), ('y', '1'), ('x', '2')]
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
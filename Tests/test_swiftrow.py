@@ -0,0 +1,39 @@
+'''
+About  : Tests the swiftrow.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+import pytest
+
+import const
+from swiftrow import SwiftRow
+
+# ------------------------------------------------------------------------------
+
+def test_swift_row():
+
+    row = SwiftRow()
+    row[const.S_NAME] = 'Turdus iliacus'
+    clone = row.copy()
+    clone[const.S_NAME] = 'Turdus pilaris'
+
+    assert list(row) == const.S_COLUMNS
+    assert row[const.S_NAME] == 'Turdus iliacus' and row[const.S_DATE] == ''
+    assert clone.get(const.S_NAME) == 'Turdus pilaris'
+    assert dict(row) == {**dict.fromkeys(const.S_COLUMNS, ''),
+                         const.S_NAME: 'Turdus iliacus'}
+    with pytest.raises(KeyError):
+        row['Unknown'] = ''
+    with pytest.raises(TypeError):
+        del row[const.S_NAME]
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''
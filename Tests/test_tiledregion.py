@@ -0,0 +1,40 @@
+'''
+About  : Tests the tiledregion.py module.
+'''
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../Code'))
+
+import numpy as np
+import shapely
+
+from tiledregion import TiledRegion
+
+# ------------------------------------------------------------------------------
+
+def test_tiled_region():
+
+    # Detailed circle with a hole, straddling a 100km grid line
+    region = shapely.Point(400000, 350000).buffer(30000, 256).difference(
+        shapely.Point(400000, 350000).buffer(5000, 64))
+    tiles = TiledRegion(region, 50)
+
+    assert shapely.get_num_coordinates(tiles.clips[~tiles.inside]).max() <= 50
+    assert tiles.inside.any()
+
+    rng = np.random.default_rng(0)
+    e = rng.integers(360000, 440000, 5000)
+    n = rng.integers(310000, 390000, 5000)
+    s = rng.choice([10, 100, 1000, 2000], 5000)
+    boxes = shapely.box(e, n, e + s, n + s)
+
+    assert (tiles.intersects(boxes) == shapely.intersects(region, boxes)).all()
+
+# ------------------------------------------------------------------------------
+
+'''
+End
+'''